@@ -0,0 +1,337 @@
+"""Local stand-ins for the services the workers call, so a benchmark needs no network.
+
+FakeUpstream is one HTTP server for the crewai API, the OpenAI chat API and
+customer webhooks, each answering after a configurable latency. Requests go
+over real sockets through the workers' pooled HTTP client, so connection
+handling is part of what gets measured.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+from pymongo import monitoring
+from requests.adapters import HTTPAdapter
+
+# One answer that parses as every structured output the crews ask for (Verdict, BatchVerdict, CriteriaList)
+LLM_ANSWER = {
+    "pass": True,
+    "message": "benchmark",
+    "criteria_results": [],
+    "results": [],
+    "criteria": [],
+}
+
+SITE_HTML = b"<html><head><title>Benchmark lead</title></head><body><p>We sell software.</p></body></html>"
+
+
+class FakeUpstream:
+    """crewai API, OpenAI chat completions and webhook sink on 127.0.0.1.
+
+    Latencies are in seconds and are slept per request, so concurrent
+    requests overlap the way they do against the real services.
+    """
+
+    def __init__(self, port=0, llm_latency=0.5, webhook_latency=0.05):
+        self.llm_latency = llm_latency
+        self.webhook_latency = webhook_latency
+        self.requests = Counter()
+        self.webhook_leads = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, path, leads=0):
+        with self._lock:
+            self.requests[path] += 1
+            self.webhook_leads += leads
+
+    def respond(self, path, body):
+        """(status, content type, body bytes) for a request; runs on the server's request thread."""
+        if path == "/v1/chat/completions":
+            time.sleep(self.llm_latency)
+            return 200, "application/json", json.dumps(chat_completion(body)).encode()
+        if path == "/preverify":
+            time.sleep(self.llm_latency)
+            return 200, "application/json", json.dumps(LLM_ANSWER).encode()
+        if path == "/preverify/batch":
+            time.sleep(self.llm_latency)
+            leads = json.loads(body or b"{}").get("leads", [])
+            results = {str(lead["leadId"]): {"pass": True} for lead in leads}
+            return 200, "application/json", json.dumps({"results": results}).encode()
+        if path in ("/scrape", "/analyze"):
+            time.sleep(self.llm_latency)
+            return 200, "application/json", json.dumps(LLM_ANSWER).encode()
+        if path.startswith("/webhook"):
+            time.sleep(self.webhook_latency)
+            self.count("/webhook", leads=_webhook_lead_count(body))
+            return 200, "application/json", b'{"ok": true}'
+        if path.startswith("/site"):
+            return 200, "text/html", SITE_HTML
+        return 404, "application/json", b'{"error": "not found"}'
+
+
+def chat_completion(body):
+    """OpenAI-shaped reply; crew agents get their answer in the ReAct format they parse."""
+    request = json.loads(body or b"{}")
+    prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+    if "Final Answer" in prompt:
+        content = "Thought: I now know the final answer\nFinal Answer: " + json.dumps(LLM_ANSWER)
+    else:
+        # The worker's URL check asks for this JSON directly
+        content = json.dumps({"isValid": True, "reason": "benchmark"})
+    return {
+        "id": "chatcmpl-benchmark",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "benchmark"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4},
+    }
+
+
+def _webhook_lead_count(body):
+    # A batched webhook carries several leads: a JSON array, a {"leads": [...]} object or ndjson lines
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return len([line for line in body.splitlines() if line.strip()])
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict) and isinstance(data.get("leads"), list):
+        return len(data["leads"])
+    return 1
+
+
+def _handler_for(upstream):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _read_body(self):
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int(self.rfile.readline().strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return b"".join(chunks)
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _reply(self):
+            body = self._read_body() if self.command == "POST" else b""
+            path = urlsplit(self.path).path
+            if not path.startswith("/webhook"):
+                upstream.count(path)
+            status, content_type, payload = upstream.respond(path, body)
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = _reply
+        do_POST = _reply
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Send requests for a fixed host (e.g. api.openai.com) to the fake upstream instead."""
+
+    def __init__(self, target_url, **kwargs):
+        super().__init__(**kwargs)
+        self.target = urlsplit(target_url)
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self.target.scheme, self.target.netloc, parts.path, parts.query, parts.fragment))
+        return super().send(request, **kwargs)
+
+
+class FakeCalendarService:
+    """The part of the Calendar API the googleCalendar task uses, backed by a list of events.
+
+    freebusy reports the events inserted so far, so booked slots are busy for
+    the next lead like they are on a real calendar.
+    """
+
+    def __init__(self, calendar, latency=0.1):
+        self._calendar = calendar
+        self.latency = latency
+
+    def freebusy(self):
+        return self
+
+    def events(self):
+        return self
+
+    def query(self, body):
+        return _Call(self.latency, lambda: self._calendar.freebusy(body))
+
+    def insert(self, calendarId, body, conferenceDataVersion=0):
+        return _Call(self.latency, lambda: self._calendar.insert(body))
+
+
+class FakeCalendar:
+    """Events of one fake calendar, shared by every service built for it."""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def freebusy(self, body):
+        with self._lock:
+            busy = [{"start": event["start"]["dateTime"], "end": event["end"]["dateTime"]} for event in self.events]
+        return {"calendars": {item["id"]: {"busy": busy} for item in body["items"]}}
+
+    def insert(self, body):
+        with self._lock:
+            event_id = f"event{len(self.events)}"
+            event = dict(body, id=event_id, htmlLink=f"https://calendar.example/{event_id}", conferenceData={
+                "entryPoints": [{"entryPointType": "video", "uri": f"https://meet.example/{event_id}"}],
+            })
+            self.events.append(event)
+        return event
+
+
+class _Call:
+    def __init__(self, latency, fn):
+        self.latency = latency
+        self.fn = fn
+
+    def execute(self):
+        time.sleep(self.latency)
+        return self.fn()
+
+
+def calendar_tokens():
+    """Tokens that stay valid for the whole run, so no refresh goes to Google."""
+    expiry = datetime.now(timezone.utc) + timedelta(days=1)
+    return {
+        "access_token": "benchmark-access-token",
+        "refresh_token": "benchmark-refresh-token",
+        "expiry_date": int(expiry.timestamp() * 1000),
+    }
+
+
+class OpCounter:
+    """Count MongoDB operations by command name, from pymongo events or the mongomock wrappers."""
+
+    def __init__(self):
+        self.ops = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            self.ops[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.ops.clear()
+
+    def total(self):
+        with self._lock:
+            return sum(self.ops.values())
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.ops)
+
+    def listener(self):
+        counter = self
+
+        class CommandCounter(monitoring.CommandListener):
+            def started(self, event):
+                # Handshakes and cursor cleanup are the driver's, not the task's
+                if event.command_name not in ("hello", "isMaster", "ismaster", "ping", "endSessions"):
+                    counter.add(event.command_name)
+
+            def succeeded(self, event):
+                pass
+
+            def failed(self, event):
+                pass
+
+        return CommandCounter()
+
+
+# Collection methods that send one command each to a real server
+COUNTED_METHODS = {
+    "find": "find", "find_one": "find", "count_documents": "aggregate", "aggregate": "aggregate",
+    "insert_one": "insert", "insert_many": "insert", "replace_one": "update",
+    "update_one": "update", "update_many": "update", "find_one_and_update": "findAndModify",
+    "delete_one": "delete", "delete_many": "delete", "bulk_write": "bulkWrite",
+    "create_index": "createIndexes",
+}
+
+
+class CountingClient:
+    """mongomock client whose collections count the operations made through them."""
+
+    def __init__(self, client, counter):
+        self._client = client
+        self._counter = counter
+
+    def get_default_database(self, *args, **kwargs):
+        return _CountingDatabase(self._client.get_default_database(*args, **kwargs), self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _CountingDatabase:
+    def __init__(self, db, counter):
+        self._db = db
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return _CountingCollection(self._db[name], self._counter)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+class _CountingCollection:
+    def __init__(self, collection, counter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        command = COUNTED_METHODS.get(name)
+        if command is None:
+            return attribute
+
+        def counted(*args, **kwargs):
+            self._counter.add(command)
+            return attribute(*args, **kwargs)
+
+        return counted
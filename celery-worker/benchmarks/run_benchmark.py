@@ -0,0 +1,481 @@
+"""Offline throughput benchmark of the lead pipeline.
+
+Synthetic leads are run through the real task functions, with fake
+upstreams (crewai API, OpenAI, Google Calendar, webhook endpoint) that
+answer after a configurable latency, the in-memory broker and either
+mongomock or a local mongod. Prints throughput, p50/p99 latency and MongoDB
+operations per lead.
+
+Usage: python benchmarks/run_benchmark.py <scenario> [options]
+  preVerify, googleCalendar, sendWebhook
+      run one node's task for every lead, --concurrency at a time
+  pipeline
+      publish every lead to a preVerify -> googleCalendar -> sendWebhook flow
+      and let an in-process worker take it to the end through the broker
+  crewai
+      load one crewai API endpoint (--endpoint), started with the fake LLM
+      unless --crewai-url points at a running one
+
+e.g.   python benchmarks/run_benchmark.py preVerify --leads 500 --concurrency 20 --llm-latency 0.8
+       python benchmarks/run_benchmark.py sendWebhook --mongo mongodb://localhost:27017/leadBenchmark
+       python benchmarks/run_benchmark.py pipeline --json --max-p99 5 --min-throughput 10
+
+--max-p99 and --min-throughput make the run exit with 1 when missed, for CI.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREWAI_DIR = os.path.join(os.path.dirname(WORKER_DIR), "crewai")
+
+# The worker's modules import each other from its root (config, db, utils, tasks)
+sys.path.insert(0, WORKER_DIR)
+
+from benchmarks.fakes import (  # noqa: E402
+    CountingClient, FakeCalendar, FakeCalendarService, FakeUpstream, OpCounter, RedirectAdapter, calendar_tokens,
+)
+
+NODE_SCENARIOS = ("preVerify", "googleCalendar", "sendWebhook")
+PIPELINE = ("preVerify_1", "googleCalendar_1", "sendWebhook_1")
+CREWAI_ENDPOINTS = ("preverify", "analyze", "scrape")
+
+DEFAULT_MONGO_URI = "mongodb://localhost:27017/leadBenchmark"
+
+CRITERIA = [
+    {"name": "Company size", "description": "More than 10 employees", "must_have": True},
+    {"name": "Budget", "description": "Has budget for software this year", "must_have": False},
+]
+
+TRANSCRIPT_PROMPT = "The lead is interested in a demo and has budget this quarter."
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the lead pipeline.")
+    parser.add_argument("scenario", choices=(*NODE_SCENARIOS, "pipeline", "crewai"))
+    parser.add_argument("--leads", type=int, default=200, help="synthetic leads to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="tasks or requests running at once")
+    parser.add_argument("--mongo", default="mongomock",
+                        help="mongomock, or the URI of a local mongod (seeded documents are removed afterwards)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per crewai or OpenAI call")
+    parser.add_argument("--webhook-latency", type=float, default=0.05, help="seconds per webhook request")
+    parser.add_argument("--calendar-latency", type=float, default=0.1, help="seconds per Calendar API call")
+    parser.add_argument("--domains", type=int, default=0,
+                        help="distinct lead website domains, fewer than --leads exercises the URL verdict cache")
+    parser.add_argument("--scrape", action="store_true", help="preVerify: enable web scraping and the URL check")
+    parser.add_argument("--batch-verify", action="store_true", help="preVerify: batch field verification")
+    parser.add_argument("--webhook-batch", choices=("json", "array", "ndjson"),
+                        help="sendWebhook: batchMode of the node")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="pipeline: leads published per second, 0 publishes them all at once")
+    parser.add_argument("--timeout", type=float, default=600, help="pipeline and crewai: seconds to wait for the run")
+    parser.add_argument("--endpoint", choices=CREWAI_ENDPOINTS, default="preverify", help="crewai: endpoint to load")
+    parser.add_argument("--crewai-url", help="crewai: a running API instead of starting one with the fake LLM")
+    parser.add_argument("--json", action="store_true", help="print the report as one JSON line")
+    parser.add_argument("--verbose", action="store_true", help="keep the tasks' own output")
+    parser.add_argument("--max-p99", type=float, help="fail when the p99 latency is above this many seconds")
+    parser.add_argument("--min-throughput", type=float, help="fail when fewer leads per second than this")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    """Settings the worker's Config reads at import, so this runs before anything of the worker is imported."""
+    os.environ["RABBITMQ_URL"] = "memory://"
+    os.environ["MONGO_URI"] = DEFAULT_MONGO_URI if args.mongo == "mongomock" else args.mongo
+    os.environ["TRACE_FILE"] = ""
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["FLOW_ROUTING_MODE"] = "broker"
+    os.environ["FLOW_ROUTING_HTTP_FALLBACK"] = "false"
+    os.environ["WORKER_CONCURRENCY"] = str(args.concurrency)
+    # Eager retries run immediately, so deferring to a saturated endpoint would only measure retries
+    os.environ.setdefault("WEBHOOK_MAX_IN_FLIGHT", str(args.concurrency))
+    for name in ("OPENAI_API_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile, q in 0-100."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+#--------------- Worker setup ---------------#
+def connect_mongo(args, counter):
+    """Point the worker's Mongo singleton at mongomock or the local mongod, counting operations."""
+    import db
+    if args.mongo == "mongomock":
+        import mongomock
+        db._client = CountingClient(mongomock.MongoClient(DEFAULT_MONGO_URI), counter)
+    else:
+        from pymongo import MongoClient
+        from utils.metrics import MongoCommandTimer
+        db._client = MongoClient(args.mongo, event_listeners=[MongoCommandTimer(), counter.listener()])
+        db._client.admin.command("ping")
+    return db._client.get_default_database()
+
+
+def use_fake_upstreams(args, upstream):
+    """Send the tasks' crewai, OpenAI and Google Calendar calls to the fakes."""
+    from config import Config
+    from tasks import pre_verify
+    from utils import calendarClient, httpClient
+
+    pre_verify.CREWAI_API_URL = upstream.url
+    httpClient.get_session().mount("https://api.openai.com", RedirectAdapter(
+        upstream.url, pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE))
+
+    calendar = FakeCalendar()
+    calendarClient.CalendarClient._build_service = lambda self: FakeCalendarService(calendar, args.calendar_latency)
+    return calendar
+
+
+def node_settings(node_type, args, upstream, connection_id):
+    if node_type == "preVerify":
+        return {
+            "criteria": CRITERIA,
+            "enableWebScraping": args.scrape,
+            "webScrapingPrompt": "The company sells software.",
+            "batchVerify": args.batch_verify,
+        }
+    if node_type == "googleCalendar":
+        return {
+            "connection": connection_id,
+            "startTime": "08:00",
+            "endTime": "20:00",
+            "startWorkday": 0,
+            "endWorkday": 6,
+            "duration": 15,
+            "eventName": "Benchmark call",
+        }
+    return {
+        "webhookUrl": f"{upstream.url}/webhook",
+        "batchMode": args.webhook_batch,
+    }
+
+
+def synthetic_lead(index, domains):
+    domain = index % domains if domains else index
+    return {
+        "full_name": f"Lead {index}",
+        "email": f"lead{index}@lead{domain}.com",
+        "phone": f"+8490{index:07d}",
+        "custom_fields": {
+            "website_link": f"https://www.lead{domain}.com/about",
+            "company": f"Company {index}",
+        },
+    }
+
+
+def seed(database, node_ids, args, upstream):
+    """Insert a user with a calendar connection, a flow through node_ids and --leads leads."""
+    from bson import ObjectId
+
+    user_id, flow_id = ObjectId(), ObjectId()
+    connection_id = f"benchmark-{user_id}"
+    database["users"].insert_one({
+        "_id": user_id,
+        "calendarConnection": [{"profile": {"id": connection_id}, "tokens": calendar_tokens()}],
+    })
+    database["flows"].insert_one({
+        "_id": flow_id,
+        "userId": user_id,
+        "status": 2,
+        "updatedAt": datetime.now(timezone.utc),
+        "nodeData": {"nodes": [
+            {"id": node_id, "data": {"settings": node_settings(node_id.split("_")[0], args, upstream, connection_id)}}
+            for node_id in node_ids
+        ]},
+        "routeData": [
+            {"source": source, "target": target}
+            for source, target in zip(node_ids, node_ids[1:])
+        ],
+    })
+    lead_ids = database["leads"].insert_many([
+        {"userId": user_id, "flowId": flow_id, "status": 1, "leadData": synthetic_lead(index, args.domains)}
+        for index in range(args.leads)
+    ]).inserted_ids
+    return {"userId": user_id, "flowId": flow_id, "connectionId": connection_id, "leadIds": lead_ids}
+
+
+def cleanup(database, seeded):
+    database["leads"].delete_many({"flowId": seeded["flowId"]})
+    database["flows"].delete_one({"_id": seeded["flowId"]})
+    database["users"].delete_one({"_id": seeded["userId"]})
+    database["calendarReservations"].delete_many({"connectionId": seeded["connectionId"]})
+
+
+def first_message(seeded, leadId, target):
+    from utils.dbUtils import get_compiled_flow
+
+    flow = get_compiled_flow({"flowId": str(seeded["flowId"])})
+    return {
+        "leadId": str(leadId),
+        "flowId": str(seeded["flowId"]),
+        "userId": str(seeded["userId"]),
+        "nodeId": "trigger",
+        "targetNode": target,
+        "flowVersion": flow.version,
+    }
+
+
+#--------------- Scenarios ---------------#
+def run_node(args, seeded):
+    """Run the node's task eagerly for every lead, args.concurrency at a time; returns (latencies, failed)."""
+    from celery_app import app
+
+    task = app.tasks[f"tasks.{args.scenario}"]
+    messages = [first_message(seeded, leadId, f"{args.scenario}_1") for leadId in seeded["leadIds"]]
+
+    def run_one(message):
+        started = time.perf_counter()
+        result = task.apply(kwargs={"message": message})
+        return time.perf_counter() - started, result.successful()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(run_one, messages))
+    return [latency for latency, _ in outcomes], sum(1 for _, ok in outcomes if not ok)
+
+
+def run_pipeline(args, seeded):
+    """Publish every lead into the flow and time it until its last node finishes in an in-process worker."""
+    from celery.contrib.testing.worker import start_worker
+    from celery.signals import task_postrun
+    from kombu import Exchange, Queue
+
+    from celery_app import app
+    from utils.dbUtils import get_compiled_flow
+    from utils.flowRouter import downstream_signature
+
+    # The server's queues: one per node type, bound to its topic exchange with "#"
+    node_types = [node_id.split("_")[0] for node_id in PIPELINE]
+    app.conf.task_queues = [
+        Queue(f"{node_type}.consumer", Exchange(node_type, type="topic", durable=True), routing_key="#")
+        for node_type in node_types
+    ]
+
+    published, finished = {}, {}
+    failed = set()
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def on_postrun(task_id=None, task=None, kwargs=None, state=None, **extra):
+        message = (kwargs or {}).get("message") or {}
+        leadId = message.get("leadId")
+        if leadId not in published:
+            return
+        if state == "FAILURE" or (state == "SUCCESS" and message.get("targetNode") == PIPELINE[-1]):
+            with lock:
+                finished.setdefault(leadId, time.perf_counter())
+                if state == "FAILURE":
+                    failed.add(leadId)
+                if len(finished) == len(seeded["leadIds"]):
+                    done.set()
+
+    task_postrun.connect(on_postrun, weak=False)
+    flow = get_compiled_flow({"flowId": str(seeded["flowId"])})
+    with start_worker(app, concurrency=args.concurrency, pool="threads", perform_ping_check=False,
+                      shutdown_timeout=30, queues=[queue.name for queue in app.conf.task_queues]):
+        for leadId in seeded["leadIds"]:
+            # Sent like the server's first publish, as the canvas the trigger node would build
+            message = first_message(seeded, leadId, "trigger")
+            published[message["leadId"]] = time.perf_counter()
+            downstream_signature(app, message, PIPELINE[0], flow)[0].apply_async()
+            if args.rate:
+                time.sleep(1 / args.rate)
+        if not done.wait(args.timeout):
+            print(f"Timed out with {len(published) - len(finished)} leads unfinished.", file=sys.stderr)
+    task_postrun.disconnect(on_postrun)
+
+    latencies = [finished[leadId] - published[leadId] for leadId in finished]
+    return latencies, len(failed) + len(published) - len(finished)
+
+
+def start_crewai(upstream):
+    """Start the crewai API with the fake LLM; returns (process, base URL)."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        OPENAI_API_KEY="benchmark",
+        OPENAI_API_BASE=f"{upstream.url}/v1",
+        OPENAI_BASE_URL=f"{upstream.url}/v1",
+        TRACE_FILE="",
+    )
+    process = subprocess.Popen([sys.executable, "api_server.py"], cwd=CREWAI_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_for_port(url, process, timeout):
+    host, port = url.split("//")[1].split(":")
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"crewai API exited with code {process.returncode}")
+        with contextlib.suppress(OSError), socket.create_connection((host, int(port)), timeout=1):
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"crewai API not listening on {url} after {timeout} seconds")
+
+
+def crewai_payload(endpoint, index, upstream, domains):
+    lead = synthetic_lead(index, domains)
+    if endpoint == "preverify":
+        return {"leadData": json.dumps(lead), "criteriaField": json.dumps(CRITERIA)}
+    if endpoint == "analyze":
+        transcript = "\n".join(
+            f"{'Agent' if turn % 2 == 0 else lead['full_name']}: turn {turn} of call {index}" for turn in range(20))
+        return {"customerPrompt": TRANSCRIPT_PROMPT, "transcript": transcript}
+    return {"url": f"{upstream.url}/site/{index}", "promptCriteria": "The company sells software."}
+
+
+def run_crewai(args, upstream):
+    """POST one synthetic request per lead to the endpoint; returns (latencies, failed)."""
+    import requests
+
+    process, url = (None, args.crewai_url) if args.crewai_url else start_crewai(upstream)
+    try:
+        wait_for_port(url, process, args.timeout)
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+        def run_one(index):
+            started = time.perf_counter()
+            try:
+                response = session.post(f"{url}/{args.endpoint}", timeout=args.timeout,
+                                        json=crewai_payload(args.endpoint, index, upstream, args.domains))
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            outcomes = list(executor.map(run_one, range(args.leads)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+    return [latency for latency, _ in outcomes], sum(1 for _, ok in outcomes if not ok)
+
+
+#--------------- Report ---------------#
+def metric_total(metric, suffix):
+    return sum(
+        sample.value
+        for family in metric.collect()
+        for sample in family.samples
+        if sample.name.endswith(suffix)
+    )
+
+
+def build_report(args, latencies, failed, wall, counter, upstream):
+    report = {
+        "scenario": args.scenario if args.scenario != "crewai" else f"crewai /{args.endpoint}",
+        "leads": args.leads,
+        "failed": failed,
+        "concurrency": args.concurrency,
+        "mongo": "mongomock" if args.mongo == "mongomock" else "mongod",
+        "wallSeconds": round(wall, 3),
+        "throughput": round(args.leads / wall, 2) if wall else None,
+        "p50Seconds": round(percentile(latencies, 50), 4) if latencies else None,
+        "p99Seconds": round(percentile(latencies, 99), 4) if latencies else None,
+        "upstreamRequests": dict(upstream.requests),
+    }
+    if args.scenario == "crewai":
+        report["llmCallsPerLead"] = round(upstream.requests["/v1/chat/completions"] / args.leads, 2)
+        return report
+
+    from utils import metrics
+
+    report["dbOpsPerLead"] = round(counter.total() / args.leads, 2)
+    report["dbOps"] = counter.snapshot()
+    report["retries"] = int(metric_total(metrics.RETRIES, "_total"))
+    # Mean time a lead's task runs spent waiting on each dependency, summed over its nodes
+    for key, histogram in (("db", metrics.DB_TIME), ("http", metrics.HTTP_TIME), ("llm", metrics.LLM_TIME)):
+        report[f"{key}SecondsPerLead"] = round(metric_total(histogram, "_sum") / args.leads, 4)
+    if upstream.webhook_leads:
+        report["webhookLeads"] = upstream.webhook_leads
+    return report
+
+
+def print_report(report):
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        print(f"{key:<{width}}  {json.dumps(value) if isinstance(value, dict) else value}")
+
+
+def check_thresholds(args, report):
+    problems = []
+    if args.max_p99 is not None and (report["p99Seconds"] is None or report["p99Seconds"] > args.max_p99):
+        problems.append(f"p99 {report['p99Seconds']}s is above {args.max_p99}s")
+    if args.min_throughput is not None and (report["throughput"] or 0) < args.min_throughput:
+        problems.append(f"throughput {report['throughput']} leads/s is below {args.min_throughput}")
+    if report["failed"]:
+        problems.append(f"{report['failed']} of {report['leads']} leads failed")
+    return problems
+
+
+def main(argv):
+    args = parse_args(argv[1:])
+    configure_environment(args)
+
+    counter = OpCounter()
+    upstream = FakeUpstream(llm_latency=args.llm_latency, webhook_latency=args.webhook_latency).start()
+    seeded = database = None
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    try:
+        with output:
+            if args.scenario == "crewai":
+                started = time.perf_counter()
+                latencies, failed = run_crewai(args, upstream)
+            else:
+                import celery_app  # noqa: F401  registers the tasks and signal handlers
+                from utils.dbUtils import flush_lead_updates
+
+                database = connect_mongo(args, counter)
+                use_fake_upstreams(args, upstream)
+                node_ids = PIPELINE if args.scenario == "pipeline" else (f"{args.scenario}_1",)
+                seeded = seed(database, node_ids, args, upstream)
+                counter.reset()
+
+                started = time.perf_counter()
+                latencies, failed = (run_pipeline if args.scenario == "pipeline" else run_node)(args, seeded)
+                # Buffered status writes are part of each lead's cost
+                flush_lead_updates()
+            wall = time.perf_counter() - started
+            report = build_report(args, latencies, failed, wall, counter, upstream)
+    finally:
+        if seeded is not None and args.mongo != "mongomock":
+            cleanup(database, seeded)
+        upstream.stop()
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+    problems = check_thresholds(args, report)
+    for problem in problems:
+        print(f"FAIL: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,5 +1,9 @@
+import os
 from celery import Celery
 from config import Config
+from utils.flowCache import FlowCacheInvalidationConsumer
+import utils.metrics  # registers the publish and worker_init signal handlers
+import utils.tracing  # registers the traceparent publish header
 
 app = Celery(
     "lead_verifier",
@@ -22,6 +26,47 @@ app.conf.update(
     broker_heartbeat = 10  # Adjust heartbeat interval
 )
 
+def _profile(queue, pool, concurrency, prefetch_multiplier, acks_late, metrics_port):
+    name = queue.split('.')[0]
+    return {
+        'queue': queue,
+        'pool': pool,
+        # e.g. PREVERIFY_CONCURRENCY=20 when the batch size is raised
+        'concurrency': int(os.getenv(f'{name.upper()}_CONCURRENCY', concurrency)),
+        'prefetch_multiplier': prefetch_multiplier,
+        'acks_late': acks_late,
+        # Distinct per profile so several workers can share a host
+        'metrics_port': metrics_port,
+    }
+
+# Worker settings per queue, picked by run_worker.py through WORKER_PROFILE.
+# I/O-bound nodes run many greenlets that each prefetch a few messages. Long LLM and
+# booking tasks take one message per slot and ack it when done, so a busy worker
+# doesn't hoard messages another worker could run, and a crash redelivers them.
+# aiCall acks early: redelivering it would call the lead twice.
+WORKER_PROFILES = {
+    'aiCall': _profile('aiCall.consumer', 'gevent', 50, prefetch_multiplier=4, acks_late=False, metrics_port=9101),
+    'sendWebhook': _profile('sendWebhook.consumer', 'gevent', 100, prefetch_multiplier=4, acks_late=True,
+                            metrics_port=9102),
+    'googleCalendar': _profile('googleCalendar.consumer', 'gevent', 20, prefetch_multiplier=1, acks_late=True,
+                               metrics_port=9103),
+    'preVerify': _profile('preVerify.consumer', 'gevent', 10, prefetch_multiplier=1, acks_late=True,
+                          metrics_port=9104),
+}
+
+_worker_profile = WORKER_PROFILES.get(os.getenv('WORKER_PROFILE', ''))
+if _worker_profile:
+    app.conf.update(
+        worker_pool=_worker_profile['pool'],
+        worker_concurrency=_worker_profile['concurrency'],
+        worker_prefetch_multiplier=_worker_profile['prefetch_multiplier'],
+        task_acks_late=_worker_profile['acks_late'],
+        task_reject_on_worker_lost=_worker_profile['acks_late'],
+    )
+
+# Drop cached flows when the server announces a flow change
+app.steps['consumer'].add(FlowCacheInvalidationConsumer)
+
 def _import_tasks():
     import tasks.ai_call
     import tasks.pre_verify
@@ -18,6 +18,74 @@ class Config:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4')
 
+    # In-process flow cache
+    FLOW_CACHE_MAX_SIZE = int(os.getenv('FLOW_CACHE_MAX_SIZE', 256))
+    FLOW_CACHE_TTL = int(os.getenv('FLOW_CACHE_TTL', 300))  # seconds
+
+    # Write-behind buffer for lead status updates
+    LEAD_WRITE_BATCH_SIZE = int(os.getenv('LEAD_WRITE_BATCH_SIZE', 100))
+    LEAD_WRITE_FLUSH_INTERVAL = float(os.getenv('LEAD_WRITE_FLUSH_INTERVAL', 0.5))  # seconds
+
+    # Shared HTTP client, pool size should match the worker's --concurrency
+    WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 5))
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', WORKER_CONCURRENCY))
+    HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', 10))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))  # seconds
+    LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 300))  # seconds, crewai API and OpenAI calls
+
+    # How a finished node hands the lead to the next one: "broker" publishes the next task
+    # directly, "http" asks the server's /api/lead/publish to do it
+    FLOW_ROUTING_MODE = os.getenv('FLOW_ROUTING_MODE', 'broker').lower()
+    FLOW_ROUTING_HTTP_FALLBACK = os.getenv('FLOW_ROUTING_HTTP_FALLBACK', 'true').lower() == 'true'
+
+    # Prometheus scrape endpoint of the worker, 0 turns it off. run_worker.py sets one per profile.
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+    # Spans of each lead's trace are appended here as JSON lines, empty turns exporting off.
+    # The trace context is propagated either way.
+    TRACE_FILE = os.getenv('TRACE_FILE', '')
+
+    # Batched pre-verification, a node can also opt in with its batchVerify setting.
+    # A batch only collects the leads this worker runs at once, so raise the concurrency with it.
+    PREVERIFY_BATCH_ENABLED = os.getenv('PREVERIFY_BATCH_ENABLED', 'false').lower() == 'true'
+    PREVERIFY_BATCH_SIZE = int(os.getenv('PREVERIFY_BATCH_SIZE', 20))
+    PREVERIFY_BATCH_WINDOW = float(os.getenv('PREVERIFY_BATCH_WINDOW', 2.0))  # seconds
+
+    # URL safety verdicts for web scraping, cached per page and host
+    URL_VERDICT_CACHE_SIZE = int(os.getenv('URL_VERDICT_CACHE_SIZE', 10000))
+    URL_VERDICT_POSITIVE_TTL = int(os.getenv('URL_VERDICT_POSITIVE_TTL', 86400))  # seconds
+    URL_VERDICT_NEGATIVE_TTL = int(os.getenv('URL_VERDICT_NEGATIVE_TTL', 3600))  # seconds
+    URL_BLOCKED_TLDS = set(os.getenv('URL_BLOCKED_TLDS', 'zip,mov,tk,ml,ga,cf,gq').split(','))
+
+    # Google Calendar booking
+    CALENDAR_HORIZON_DAYS = int(os.getenv('CALENDAR_HORIZON_DAYS', 14))
+    CALENDAR_BUFFER_MINUTES = int(os.getenv('CALENDAR_BUFFER_MINUTES', 0))
+    CALENDAR_BUSY_CACHE_TTL = int(os.getenv('CALENDAR_BUSY_CACHE_TTL', 120))  # seconds
+    CALENDAR_BUSY_CACHE_SIZE = int(os.getenv('CALENDAR_BUSY_CACHE_SIZE', 1000))
+    CALENDAR_CLIENT_CACHE_SIZE = int(os.getenv('CALENDAR_CLIENT_CACHE_SIZE', 200))
+    CALENDAR_CLIENT_CACHE_TTL = int(os.getenv('CALENDAR_CLIENT_CACHE_TTL', 3600))  # seconds
+    GOOGLE_API_TIMEOUT = float(os.getenv('GOOGLE_API_TIMEOUT', 30))  # seconds, per request
+    TOKEN_REFRESH_LEASE = int(os.getenv('TOKEN_REFRESH_LEASE', 30))  # seconds one worker may spend refreshing a token
+
+    # Webhook delivery, limits apply per endpoint and worker process
+    WEBHOOK_CONNECT_TIMEOUT = float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', 5))  # seconds
+    WEBHOOK_READ_TIMEOUT = float(os.getenv('WEBHOOK_READ_TIMEOUT', 15))  # seconds
+    WEBHOOK_MAX_IN_FLIGHT = int(os.getenv('WEBHOOK_MAX_IN_FLIGHT', 4))
+    WEBHOOK_CIRCUIT_FAILURES = int(os.getenv('WEBHOOK_CIRCUIT_FAILURES', 5))  # consecutive failures that open the circuit
+    WEBHOOK_CIRCUIT_COOLDOWN = int(os.getenv('WEBHOOK_CIRCUIT_COOLDOWN', 60))  # seconds
+    WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', 8))
+    WEBHOOK_BACKOFF_BASE = float(os.getenv('WEBHOOK_BACKOFF_BASE', 2))  # seconds
+    WEBHOOK_BACKOFF_MAX = float(os.getenv('WEBHOOK_BACKOFF_MAX', 600))  # seconds
+    # Batched webhook payloads, nodes can override these with batchMaxLeads, batchMaxBytes and batchMaxAge.
+    # Waiting leads hold a worker slot until their batch is sent, so keep the age short.
+    WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', 50))
+    WEBHOOK_BATCH_WINDOW = float(os.getenv('WEBHOOK_BATCH_WINDOW', 1.0))  # seconds
+    WEBHOOK_BATCH_MAX_BYTES = int(os.getenv('WEBHOOK_BATCH_MAX_BYTES', 1024 * 1024))
+    # Slot claims that stop concurrent tasks from booking the same time
+    CALENDAR_RESERVATION_TTL = int(os.getenv('CALENDAR_RESERVATION_TTL', 900))  # seconds
+    CALENDAR_RESERVATION_CANDIDATES = int(os.getenv('CALENDAR_RESERVATION_CANDIDATES', 10))
+
     @staticmethod
     def validate_config():
         """Validate that all required environment variables are set."""
@@ -1,5 +1,6 @@
 from pymongo import MongoClient
 from config import Config
+from utils.metrics import MongoCommandTimer
 import os
 
 # Singleton pattern to reuse the connection
@@ -12,7 +13,7 @@ def get_mongo_client():
         if not mongo_uri:
             raise ValueError("MONGO_URI environment variable not found")
         try:
-            _client = MongoClient(mongo_uri)
+            _client = MongoClient(mongo_uri, event_listeners=[MongoCommandTimer()])
             # Check if connection is successful by issuing a simple command
             _client.admin.command('ping')
             print("MongoDB connection established successfully")
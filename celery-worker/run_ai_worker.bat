@@ -10,6 +10,6 @@ pip install -r requirements.txt
 echo.
 
 echo Starting Celery worker...
-celery -A celery_app worker --queues=aiCall.consumer --loglevel=info --pool=gevent --concurrency=5 --hostname=aiCallWorker@%%h
+python run_worker.py aiCall
 
 pause
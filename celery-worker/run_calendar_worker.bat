@@ -10,6 +10,6 @@ pip install -r requirements.txt
 echo.
 
 echo Starting Celery worker...
-celery -A celery_app worker --queues=googleCalendar.consumer --loglevel=info --pool=gevent --concurrency=5 --hostname=googleCalendarWorker@%%h
+python run_worker.py googleCalendar
 
 pause
\ No newline at end of file
@@ -10,6 +10,6 @@ pip install -r requirements.txt
 echo.
 
 echo Starting Celery worker...
-celery -A celery_app worker --queues=preVerify.consumer --loglevel=info --pool=gevent --concurrency=5 --hostname=preVerifyWorker@%%h
+python run_worker.py preVerify
 
 pause
\ No newline at end of file
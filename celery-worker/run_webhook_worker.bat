@@ -10,6 +10,6 @@ pip install -r requirements.txt
 echo.
 
 echo Starting Celery worker...
-celery -A celery_app worker --queues=sendWebhook.consumer --loglevel=info --pool=gevent --concurrency=5 --hostname=goosendWebhookWorker@%%h
+python run_worker.py sendWebhook
 
 pause
@@ -1 +1 @@
-celery -A celery_app worker --queues=aiCall.consumer --loglevel=info --pool=solo
+python run_worker.py aiCall --pool=solo
@@ -0,0 +1,40 @@
+"""Start a Celery worker for one queue with its profile from celery_app.WORKER_PROFILES.
+
+Usage: python run_worker.py <profile> [extra celery worker options]
+e.g.   python run_worker.py preVerify --loglevel=debug
+"""
+import os
+import sys
+
+from celery_app import WORKER_PROFILES
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in WORKER_PROFILES:
+        print(f"Usage: python run_worker.py <{'|'.join(WORKER_PROFILES)}> [celery worker options]")
+        return 1
+
+    name = argv[1]
+    profile = WORKER_PROFILES[name]
+
+    # celery_app applies prefetch and ack settings from the profile, and the HTTP pool follows the concurrency
+    os.environ['WORKER_PROFILE'] = name
+    os.environ['WORKER_CONCURRENCY'] = str(profile['concurrency'])
+    os.environ.setdefault('METRICS_PORT', str(profile['metrics_port']))
+
+    # The pool is passed on the command line so celery monkey-patches for gevent before anything is imported
+    args = [
+        'celery', '-A', 'celery_app', 'worker',
+        f"--queues={profile['queue']}",
+        f"--pool={profile['pool']}",
+        f"--concurrency={profile['concurrency']}",
+        f"--hostname={name}Worker@%h",
+        '--loglevel=info',
+        *argv[2:],
+    ]
+    print(f"Starting {name} worker: {' '.join(args)}")
+    os.execvp(args[0], args)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
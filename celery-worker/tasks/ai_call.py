@@ -4,6 +4,7 @@ from bson import ObjectId
 import json
 import requests
 from utils.dbUtils import * 
+from utils import httpClient
 
 from tasks.base_tasks_handler import BaseTaskHandler
 
@@ -12,8 +13,9 @@ def ai_call(self, message):
     try:
         print(f"Received message: {message}")
         
-        settings = get_node_settings(message)
-        lead = get_lead(message)
+        context = self.get_context(message)
+        settings = context.settings
+        lead = context.lead
         phone = lead["leadData"].get("phone", "50002")
         phone = "50002" if phone != "50002" and phone != "50002" else phone 
         data = {
@@ -38,7 +40,7 @@ def ai_call(self, message):
             "ExtendData": {}
         }
 
-        response = requests.post(url, headers=headers, json=body, verify=False)
+        response = httpClient.post(url, headers=headers, json=body, verify=False)
         response.raise_for_status()
         print("Call API Response:", response.json())
         return response.json()
@@ -1,8 +1,10 @@
 from celery import Task
 
 from utils.dbUtils import *
+from utils.flowRouter import publish_next
+from utils import metrics
+from utils import tracing
 import traceback
-import requests
 
 # Map node names to human-readable descriptions
 NODE_TASK_NAMES = {
@@ -14,33 +16,73 @@ NODE_TASK_NAMES = {
 
 
 class BaseTaskHandler(Task):
+    def __call__(self, *args, **kwargs):
+        # Celery's tracer has pushed this run's request already; running the body directly keeps it
+        # current, so the chain it carries can still be dropped before Celery sends it on
+        retval = self.run(*args, **kwargs)
+        message = kwargs.get("message") or {}
+        if message.get("chained") and not (isinstance(retval, dict) and retval.get("isPublish", False)):
+            # Unchained, on_success only routes the lead on when the task publishes; a chain must not either
+            self.request.chain = None
+            self.request.chain_stopped = True
+        return retval
+
+    def get_context(self, message):
+        """Return the LeadContext shared by the task body and its hooks for this run."""
+        context = getattr(self.request, "lead_context", None)
+        if context is None or context.message is not message:
+            context = LeadContext(message)
+            self.request.lead_context = context
+        return context
+
     def before_start(self, task_id, args, kwargs):
         message = kwargs["message"]
-        update_lead_status_and_current_node(message['leadId'], 2, message["targetNode"])
+        metrics.task_started(self.name, message, getattr(self.request, "published_at", None), self.request.retries)
+        # Continue the lead's trace from the message headers (worker hops) or body (server publishes)
+        self.request.trace_span = tracing.start_span(
+            f"task {self.name}",
+            getattr(self.request, "traceparent", None) or message.get("traceparent"),
+            leadId=str(message.get("leadId")),
+            flowId=str(message.get("flowId")),
+            node=message.get("targetNode"),
+            retries=self.request.retries,
+        )
+        self.get_context(message)
+        if message.get("chained"):
+            # Celery sends the next node before on_success runs, so this write can't wait for a flush
+            update_lead_status_and_current_node(message['leadId'], 2, message["targetNode"])
+        else:
+            queue_lead_status_and_current_node(message['leadId'], 2, message["targetNode"])
 
     def on_success(self, retval, task_id, args, kwargs):
         data = kwargs["message"]
-        flow = get_flow(data)
-        routes = flow["routeData"]
-        is_not_finished = any(route["source"] == data["targetNode"] for route in routes)
+        context = self.get_context(data)
+        is_not_finished = len(context.routes) > 0
 
         if is_not_finished:
-            if "aiCall" not in self.name:
-                update_lead_status_and_current_node(data['leadId'], 3, data["targetNode"])
-                if retval.get("isPublish", False):
-                    response = requests.post("http://127.0.0.1:3001/api/lead/publish", json={
-                        "userId": data['userId'],
-                        "leadId": data['leadId'],
-                        "result": retval["result"],
-                        "isRetry": False,
-                    })
-                    print(f"Publish lead to next node... {response.json()}")
+            if "aiCall" in self.name:
+                pass
+            elif data.get("chained") and not getattr(self.request, "chain_stopped", False):
+                # The chain or group this task runs in has already sent the lead to the next nodes,
+                # which write the lead's status from now on
+                queue_branch_status(data['leadId'], data["targetNode"], 3)
+            else:
+                queue_lead_status_and_current_node(data['leadId'], 3, data["targetNode"])
+                if isinstance(retval, dict) and retval.get("isPublish", False):
+                    # The next node (or the server) writes the lead's status too, so our writes must land first
+                    flush_lead_updates()
+                    publish_next(self.app, data, context.flow, retval.get("result"))
+                else:
+                    # The lead stops here, and so do the branches a chain would have run after this node
+                    end_lead_branches(data['leadId'], data.get("branches", 1), data["targetNode"], finish=False)
 
             print(f"Task {self.name} succeeded. Flow continue.")
             print("-" * 50)  # Print a horizontal line of 50 dashes
         else:
             if "aiCall" not in self.name:
-                update_lead_status_and_current_node(data['leadId'], 9, data["targetNode"])
+                # Other branches of the flow may still be running; the last one to end finishes the lead
+                queue_branch_status(data['leadId'], data["targetNode"], 9)
+                end_lead_branches(data['leadId'], 1, data["targetNode"])
             print(f"Task {self.name} succeeded. Flow finished.")
 
         super().on_success(retval, task_id, args, kwargs)
@@ -62,6 +104,7 @@ class BaseTaskHandler(Task):
         data = kwargs["message"]
         update_field = {
             "status": 0,
+            f"branchStatus.{data['targetNode']}": 0,
             "error": {
                 "status": True,
                 "message": (f"Task {NODE_TASK_NAMES.get(f'{self.name}')} occurred an error when executing."),
@@ -70,5 +113,19 @@ class BaseTaskHandler(Task):
             },
         }
 
-        update_lead(data['leadId'], update_field)
+        queue_lead_update(data['leadId'], update_field)
+        end_lead_branches(data['leadId'], data.get("branches", 1), data["targetNode"], finish=False)
+        metrics.task_failed(self.name, data)
         super().on_failure(exc, task_id, args, kwargs, einfo)
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        metrics.task_retried(self.name, kwargs["message"])
+        super().on_retry(exc, task_id, args, kwargs, einfo)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        metrics.task_finished(self.name)
+        span = getattr(self.request, "trace_span", None)
+        if span is not None:
+            span.attributes["status"] = status
+            tracing.end_span(span, einfo.exception if einfo is not None and status == "FAILURE" else None)
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
@@ -1,8 +1,5 @@
 from celery_app import app
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import Flow
+from google.auth.exceptions import RefreshError
 from googleapiclient.errors import HttpError
 from config import Config
 import json
@@ -15,6 +12,9 @@ import backoff
 from tasks.base_tasks_handler import BaseTaskHandler
 from utils.dbUtils import *
 from utils.calendarTimeUtil import *
+from utils.busySlotCache import busy_slot_cache
+from utils.calendarClient import calendar_clients
+from utils.slotReservation import claim_first_free, confirm_slot, get_reserved_slots, release_slot
 
 @app.task(name="tasks.googleCalendar", base=BaseTaskHandler, bind=True, max_retries=3)
 def google_calendar(self, message):
@@ -22,61 +22,85 @@ def google_calendar(self, message):
         print(f"Received message {message} ...")
         
         # Extract the connection ID from db
-        settings = get_node_settings(message)
+        context = self.get_context(message)
+        settings = context.settings
         conn = get_user_calendar_conn(message, settings["connection"])
         tokens = conn["tokens"]
-        lead = get_lead(message)
+        lead = context.lead
         
-        # Create credentials and build service
-        credentials = create_credentials(tokens)
-        service = build('calendar', 'v3', credentials=credentials, cache_discovery=False)
-        socket.setdefaulttimeout(30)  # 30 seconds timeout
+        # Reuse the connection's credentials and services across leads
+        client = calendar_clients.get(message['userId'], settings["connection"], tokens)
+        client.ensure_fresh(message['userId'], settings["connection"])
         
         # Prepare event parameters
         duration_minute = int(settings.get('duration', 1))
         time_zone = 'UTC'
         
-        # Get busy slots
-        busy_slots = get_busy_slots(service)
-        
-        # Time conversion for available slots
-        start_str = settings["startTime"]
-        end_str = settings["endTime"]
-        start_hour = datetime.strptime(start_str, "%H:%M") - timedelta(hours=7)
-        end_hour = datetime.strptime(end_str, "%H:%M") - timedelta(hours=7)
-        
-        # Find available slot
-        next_slot = find_nearest_available_slot(busy_slots, 
-            settings["startWorkday"], settings["endWorkday"],
-            start_hour.time(), end_hour.time(), duration_minute)
-        
-        if not next_slot:
-            print("No available time slots found.")
-            return None
+        with client.service() as service:
+            # Get busy slots, across every calendar the node checks, from the per-connection cache
+            calendar_ids = settings.get('calendarIds') or ['primary']
+            busy_slots = busy_slot_cache.get_busy_slots(
+                service, message['userId'], settings["connection"], calendar_ids, Config.CALENDAR_HORIZON_DAYS)
+            # Slots other tasks claimed but Google may not report as busy yet
+            busy_slots += get_reserved_slots(settings["connection"])
+            
+            # Time conversion for available slots
+            start_str = settings["startTime"]
+            end_str = settings["endTime"]
+            start_hour = datetime.strptime(start_str, "%H:%M") - timedelta(hours=7)
+            end_hour = datetime.strptime(end_str, "%H:%M") - timedelta(hours=7)
+            
+            # Find a few available slots and claim the first one no concurrent task holds
+            candidates = find_available_slots(busy_slots, 
+                settings["startWorkday"], settings["endWorkday"],
+                start_hour.time(), end_hour.time(), duration_minute,
+                count=Config.CALENDAR_RESERVATION_CANDIDATES,
+                horizon_days=Config.CALENDAR_HORIZON_DAYS,
+                buffer_minutes=int(settings.get('bufferMinutes', Config.CALENDAR_BUFFER_MINUTES)))
+            next_slot, reservation = claim_first_free(
+                message['userId'], settings["connection"], message['leadId'], candidates, duration_minute)
             
-        # Create event body
-        start_time_str = next_slot.isoformat()
-        end_time_str = (next_slot + timedelta(minutes=duration_minute)).isoformat()
-        event_body = build_event_body(settings, lead, start_time_str, end_time_str, time_zone)
+            if not next_slot:
+                print("No available time slots found.")
+                return None
+                
+            # Create the event body and insert the calendar event, giving the slot back if either fails
+            try:
+                start_time_str = next_slot.isoformat()
+                end_time_str = (next_slot + timedelta(minutes=duration_minute)).isoformat()
+                event_body = build_event_body(settings, lead, start_time_str, end_time_str, time_zone)
+                event = service.events().insert(
+                    calendarId='primary',
+                    body=event_body,
+                    conferenceDataVersion=1
+                ).execute()
+            except Exception:
+                release_slot(reservation)
+                raise
         
-        # Insert calendar event
-        event = service.events().insert(
-            calendarId='primary',
-            body=event_body,
-            conferenceDataVersion=1
-        ).execute()
+        confirm_slot(reservation, event.get('id'))
+        busy_slot_cache.add_busy(message['userId'], settings["connection"],
+                                 next_slot, next_slot + timedelta(minutes=duration_minute))
         
         calendar_link = event.get('htmlLink')
         meet_link = extract_meet_link(event)
         
         # Cleanup and update
-        refresh_tokens_if_needed(credentials, tokens, message, settings["connection"])
+        refresh_tokens_if_needed(client, message, settings["connection"])
         
         return {
             'calendar_link': calendar_link,
             'meet_link': meet_link
         }
     
+    except RefreshError as e:
+        # Tokens were revoked or replaced, rebuild the client from the stored tokens on retry
+        print(f"Token refresh failed in google_calendar task: {e}")
+        calendar_clients.invalidate(message['userId'], settings["connection"])
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=5)
+        raise
+    
     except (socket.timeout, socket.error, TimeoutError, ConnectionError, HttpError) as e:
         print(f"Network error in google_calendar task: {e}")
         countdown = 2 ** self.request.retries
@@ -89,16 +113,6 @@ def google_calendar(self, message):
             raise self.retry(exc=e, countdown=countdown)
         raise
 
-def create_credentials(tokens):
-    """Create Google API credentials."""
-    return Credentials(
-        tokens['access_token'],
-        refresh_token=tokens['refresh_token'],
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=Config.GOOGLE_CLIENT_ID,
-        client_secret=Config.GOOGLE_CLIENT_SECRET
-    )
-
 def build_event_body(settings, lead, start_time_str, end_time_str, time_zone):
     """Build the event body for Google Calendar."""
     conference_data = {
@@ -150,15 +164,18 @@ def format_meeting_description(lead_data):
 
     return "\n".join(lines)
 
-def refresh_tokens_if_needed(credentials, tokens, message, connection):
+def refresh_tokens_if_needed(client, message, connection):
     """Update tokens in the database if they were refreshed."""
-    if credentials.token != tokens['access_token']:
+    if client.token_refreshed():
         print("Token was refreshed, updating in database...")
-        update_tokens(message['userId'], connection, {
+        credentials = client.credentials
+        tokens = {
             'access_token': credentials.token,
             'refresh_token': credentials.refresh_token,
             'expiry_date': credentials.expiry,
-        })
+        }
+        update_tokens(message['userId'], connection, tokens)
+        client.mark_stored(tokens)
 
 def extract_meet_link(event):
     """Extract the Google Meet link from the event."""
@@ -1,21 +1,29 @@
 from celery_app import app
 from db import get_mongo_client
 from utils.dbUtils import *
-import requests
+from utils import httpClient
+from utils.batcher import MicroBatcher
+from utils import urlSafety
+from utils import metrics
+from utils import tracing
 import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from config import Config
 from tasks.base_tasks_handler import BaseTaskHandler
 
+CREWAI_API_URL = "http://127.0.0.1:5000"
+
 
 def make_post_request(url, json_data):
     """Make a POST request and return the response data"""
     print(f"Making POST request to {url}.")
-    response = requests.post(
-        url=url,
+    response = httpClient.post(
+        url,
         json=json_data,
-        headers={'Content-Type': 'application/json'}
+        headers={'Content-Type': 'application/json'},
+        timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.LLM_READ_TIMEOUT),
+        kind="llm"
     )
     response.raise_for_status()  # Raise an error for bad responses
     return response.json()
@@ -50,8 +58,9 @@ def check_url(url):
     }
 
     print("Sending request to OpenAI API for URL check.")
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions", headers=headers, json=data)
+    response = httpClient.post(
+        "https://api.openai.com/v1/chat/completions", headers=headers, json=data,
+        timeout=(Config.HTTP_CONNECT_TIMEOUT, Config.LLM_READ_TIMEOUT), kind="llm")
 
     if response.status_code == 200:
         return json.loads(response.json()["choices"][0]["message"]["content"])
@@ -59,14 +68,80 @@ def check_url(url):
         return f"Error: {response.status_code} - {response.text}"
 
 
+def verify_url(url):
+    """check_url behind the local pre-filter and the per-host verdict cache."""
+    verdict = urlSafety.prefilter(url) or urlSafety.get_cached_verdict(url)
+    if verdict is not None:
+        return verdict
+
+    verdict = check_url(url)
+    if not isinstance(verdict, dict):
+        # check_url returns the error text when OpenAI fails; let the task retry instead
+        raise RuntimeError(f"URL check failed: {verdict}")
+    urlSafety.store_verdict(url, verdict)
+    return verdict
+
+
+def check_and_scrape(url, scrape_body):
+    """Check the URL and scrape it only if it is valid; returns (check result, scrape response)."""
+    check_result = verify_url(url)
+    print(f"Check URL API: {check_result}")
+    if not check_result.get("isValid", False):
+        return check_result, None
+    return check_result, make_post_request(f"{CREWAI_API_URL}/scrape", scrape_body)
+
+
+def verify_leads_batch(criteria, leads):
+    """Verify leads sharing the same criteria with one /preverify/batch call.
+
+    Returns the field verification responses in the same order as leads.
+    """
+    body = {
+        "criteriaField": json.dumps(criteria),
+        "leads": [
+            {"leadId": str(lead["_id"]), "leadData": json.dumps(lead["leadData"])}
+            for lead in leads
+        ],
+    }
+    response = make_post_request(f"{CREWAI_API_URL}/preverify/batch", body)
+    results = response.get("results", {})
+    return [results.get(str(lead["_id"]), {"pass": False}) for lead in leads]
+
+
+def _flush_field_verify_batch(key, items):
+    return verify_leads_batch(items[0]["criteria"], [item["lead"] for item in items])
+
+
+# Field verification of concurrent preVerify tasks for the same flow node is sent as one batch.
+# A batch only collects leads this worker runs at once, so it never waits for more than its concurrency.
+field_verify_batcher = MicroBatcher(
+    _flush_field_verify_batch,
+    max_size=min(Config.PREVERIFY_BATCH_SIZE, Config.WORKER_CONCURRENCY),
+    max_wait=Config.PREVERIFY_BATCH_WINDOW,
+)
+
+
+def verify_field(message, lead, criteria, batched):
+    if batched:
+        key = (message['flowId'], message['targetNode'], message.get('flowVersion'))
+        return field_verify_batcher.submit(key, {"lead": lead, "criteria": criteria})
+
+    verify_field_body = {
+        "leadData": json.dumps(lead['leadData']),
+        "criteriaField": json.dumps(criteria),
+    }
+    return make_post_request(f"{CREWAI_API_URL}/preverify", verify_field_body)
+
+
 @app.task(name="tasks.preVerify", base=BaseTaskHandler, bind=True, max_retries=3)
 def pre_verify(self, message):
     try:
         print(f"Received message: {message}")
 
         # Get required data
-        settings = get_node_settings(message)
-        lead = get_lead(message)
+        context = self.get_context(message)
+        settings = context.settings
+        lead = context.lead
 
         # Validate criteria exists
         criteria = settings.get("criteria")
@@ -75,11 +150,6 @@ def pre_verify(self, message):
             raise ValueError("No criteria found in settings.")
 
         # Prepare request payloads
-        verify_field_body = {
-            "leadData": json.dumps(lead['leadData']),
-            "criteriaField": json.dumps(criteria),
-        }
-
         website_url = lead['leadData']['custom_fields'].get('website_link')
         scrape_body = {
             "url": website_url,
@@ -96,47 +166,41 @@ def pre_verify(self, message):
 
             # Always submit field verification request
             field_verify_future = executor.submit(
-                make_post_request,
-                "http://127.0.0.1:5000/preverify",
-                verify_field_body
+                tracing.bind(metrics.bind(verify_field)),
+                message,
+                lead,
+                criteria,
+                settings.get("batchVerify", Config.PREVERIFY_BATCH_ENABLED)
             )
             futures.append(field_verify_future)
 
-            # Only process website if URL exists
+            # Only process website if URL exists; the URL check runs alongside field verification
             scrape_future = None
             if settings.get("enableWebScraping"):
-                # Validate URL first
-                check_result = check_url(website_url)
-                print(f"Check URL API: {check_result}")
-
-                if not check_result.get("isValid", False):
-                    # Update lead with invalid URL status
-                    update_lead(
-                        lead['_id'],
-                        {
-                            "isVerified": {
-                                "status": 1,
-                                "message": f"Invalid URL: {check_result.get('reason', 'Unknown error')}"
-                            },
-                        }
-                    )
-                    return {'isPublish': True, 'result': False,
-                            "reason": check_result.get("reason", "Invalid URL")}
-
-                # URL is valid, submit scraping request
-                scrape_future = executor.submit(
-                    make_post_request,
-                    "http://127.0.0.1:5000/scrape",
-                    scrape_body
-                )
+                scrape_future = executor.submit(tracing.bind(metrics.bind(check_and_scrape)), website_url, scrape_body)
                 futures.append(scrape_future)
 
             # Wait for all requests to complete
+            check_result = None
             for future in as_completed(futures):
                 if future == field_verify_future:
                     field_response = future.result()
                 elif future == scrape_future:
-                    scrape_response = future.result()
+                    check_result, scrape_response = future.result()
+
+        if check_result is not None and scrape_response is None:
+            # Update lead with invalid URL status
+            queue_lead_update(
+                lead['_id'],
+                {
+                    "isVerified": {
+                        "status": 1,
+                        "message": f"Invalid URL: {check_result.get('reason', 'Unknown error')}"
+                    },
+                }
+            )
+            return {'isPublish': True, 'result': False,
+                    "reason": check_result.get("reason", "Invalid URL")}
 
         # Log responses for debugging
         print(f"Field verify API: {field_response}")
@@ -6,19 +6,79 @@ from urllib.parse import urljoin
 import logging
 
 import datetime
+import uuid
+from config import Config
 from utils.dbUtils import *
+from utils.batcher import MicroBatcher
+from utils.webhookDelivery import DeliveryDeferred, PermanentDeliveryError, backoff_delay, webhook_delivery
 from tasks.base_tasks_handler import BaseTaskHandler
 
-@app.task(name = "tasks.sendWebhook", base= BaseTaskHandler, bind=True, max_retries=3)
-def send_webhook(self, message):    
-    # Set up logging
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger(__name__)
+# Celery sets up the handlers, configuring logging here would add duplicates on every call
+logger = logging.getLogger(__name__)
+
+
+# Payload formats of the batchMode node setting: a {"timestamp", "leads"} object, a bare array or one lead per line
+BATCH_CONTENT_TYPES = {
+    'json': 'application/json',
+    'array': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def batch_body(batch_format, lines):
+    """Yield the batch body piece by piece, so requests streams it with chunked transfer encoding."""
+    if batch_format == 'ndjson':
+        for line in lines:
+            yield line + b"\n"
+        return
+
+    if batch_format == 'json':
+        timestamp = json.dumps(datetime.datetime.now().isoformat())
+        yield f'{{"timestamp": {timestamp}, "leads": ['.encode()
+    else:
+        yield b"["
+    for index, line in enumerate(lines):
+        yield line if index == 0 else b", " + line
+    yield b"]}" if batch_format == 'json' else b"]"
+
+def deliver_batch(key, lines):
+    """Send the leads collected for one flow node and webhook URL as a single request."""
+    _, _, webhook_url, batch_format = key
+    batch_id = uuid.uuid4().hex
+    response = webhook_delivery.post(
+        webhook_url,
+        data=batch_body(batch_format, lines),
+        headers={'Content-Type': BATCH_CONTENT_TYPES[batch_format], 'X-Batch-Id': batch_id}
+    )
+    return [
+        {'response': response, 'batchId': batch_id, 'batchSize': len(lines), 'position': index}
+        for index in range(len(lines))
+    ]
+
+# Leads of the same flow node arriving together, flushed by count, bytes or age
+webhook_batcher = MicroBatcher(
+    deliver_batch, Config.WEBHOOK_BATCH_SIZE, Config.WEBHOOK_BATCH_WINDOW, Config.WEBHOOK_BATCH_MAX_BYTES)
 
+def submit_to_batch(message, settings, webhook_url, batch_format, payload):
+    """Add the lead to its node's pending batch and wait for that batch's delivery."""
+    line = json.dumps({'leadId': message['leadId'], **payload}).encode()
+    max_age = settings.get('batchMaxAge')
+    return webhook_batcher.submit(
+        (message['flowId'], message['targetNode'], webhook_url, batch_format),
+        line,
+        size=len(line),
+        max_size=int(settings.get('batchMaxLeads') or 0) or None,
+        max_bytes=int(settings.get('batchMaxBytes') or 0) or None,
+        max_wait=float(max_age) if max_age else None,
+    )
+
+@app.task(name = "tasks.sendWebhook", base= BaseTaskHandler, bind=True, max_retries=Config.WEBHOOK_MAX_RETRIES)
+def send_webhook(self, message):    
     logger.info(f"CallReceived message {message} ...")
 
-    lead = get_lead(message)
-    settings = get_node_settings(message)
+    context = self.get_context(message)
+    lead = context.lead
+    settings = context.settings
     
     # Get webhook URL from environment variable or use default
     webhook_url = settings.get("webhookUrl", None)
@@ -30,23 +90,47 @@ def send_webhook(self, message):
             'timestamp': datetime.datetime.now().isoformat()
         }
         
-        # Send the POST request to the webhook
-        response = requests.post(
+        # Send the POST request to the webhook, alone or in a batch with the node's other leads
+        batch_format = settings.get("batchMode") or ('json' if settings.get("batchPayloads", False) else None)
+        if batch_format in BATCH_CONTENT_TYPES:
+            delivery = submit_to_batch(message, settings, webhook_url, batch_format, payload)
+            response = delivery['response']
+            logger.info(f"Sent lead {message['leadId']} to {webhook_url} in batch {delivery['batchId']} "
+                        f"({delivery['batchSize']} leads), status code: {response.status_code}")
+            return {
+                'status': response.status_code,
+                'data': response.text,
+                'batchId': delivery['batchId'],
+                'batchSize': delivery['batchSize'],
+            }
+
+        response = webhook_delivery.post(
             webhook_url,
             data=json.dumps(payload),
             headers={'Content-Type': 'application/json'}
         )
         
-        # Check if the request was successful
-        response.raise_for_status()
         logger.info(f"Successfully sent webhook to {webhook_url}, status code: {response.status_code}")
         
         return {'status': response.status_code, 'data': response.text}
+    except DeliveryDeferred as e:
+        # Endpoint saturated or circuit open, give the worker slot back and try later. Nothing was sent,
+        # so deferrals are counted in the message and added to the limit, which then only bounds failed attempts
+        deferrals = message.get('deferrals', 0)
+        logger.warning(f"Deferring webhook: {str(e)}")
+        raise self.retry(
+            exc=e,
+            kwargs={'message': {**message, 'deferrals': deferrals + 1}},
+            countdown=e.retry_after + backoff_delay(deferrals),
+            max_retries=self.max_retries + deferrals + 1,
+        )
+    except PermanentDeliveryError as e:
+        logger.error(f"Failed to send webhook: {str(e)}")
+        raise
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to send webhook: {str(e)}")
-        if self.request.retries < self.max_retries:
-            countdown = 5  # Retry after 5 seconds
-            raise self.retry(exc=e, countdown=countdown)
+        deferrals = message.get('deferrals', 0)
+        failures = self.request.retries - deferrals
+        if failures < self.max_retries:
+            raise self.retry(exc=e, countdown=backoff_delay(failures), max_retries=self.max_retries + deferrals)
         raise
-    
-    
\ No newline at end of file
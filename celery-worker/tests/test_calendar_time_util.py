@@ -0,0 +1,52 @@
+from datetime import datetime, time, timedelta, timezone
+
+from utils.calendarTimeUtil import _sweep_free_slots, find_available_slots, merge_busy_intervals
+
+# A Monday
+NOW = datetime(2026, 10, 19, 7, 0, tzinfo=timezone.utc)
+
+
+def at(hour, minute=0, day=0):
+    return NOW.replace(hour=hour, minute=minute) + timedelta(days=day)
+
+
+def test_merge_sorts_and_joins_overlapping_intervals():
+    busy = [(at(13), at(14)), (at(9), at(10)), (at(9, 30), at(11)), (at(11), at(12))]
+
+    assert merge_busy_intervals(busy) == [(at(9), at(12)), (at(13), at(14))]
+
+
+def test_merge_pads_intervals_by_the_buffer():
+    busy = [(at(9), at(10)), (at(10, 20), at(11))]
+
+    assert merge_busy_intervals(busy, buffer_minutes=15) == [(at(8, 45), at(11, 15))]
+
+
+def test_sweep_skips_busy_intervals_on_the_slot_grid():
+    windows = [(at(8), at(12))]
+    merged = [(at(8, 30), at(9, 15))]
+
+    assert _sweep_free_slots(windows, merged, NOW, 60, 3) == [at(10), at(11)]
+
+
+def test_sweep_skips_slots_before_now():
+    windows = [(at(6), at(10))]
+
+    assert _sweep_free_slots(windows, [], NOW, 60, 2) == [at(7), at(8)]
+
+
+def test_sweep_continues_in_the_next_window():
+    windows = [(at(8), at(10)), (at(8, day=1), at(10, day=1))]
+    merged = [(at(8), at(10))]
+
+    assert _sweep_free_slots(windows, merged, NOW, 60, 1) == [at(8, day=1)]
+
+
+def test_find_available_slots_respects_working_days():
+    # Friday afternoon is busy, so the next slot is on Monday
+    friday = NOW + timedelta(days=4)
+    busy = [(friday.replace(hour=8), friday.replace(hour=17))]
+
+    slots = find_available_slots(busy, 0, 4, time(8), time(17), 60, count=1, now=friday.replace(hour=7))
+
+    assert slots == [at(8, day=7)]
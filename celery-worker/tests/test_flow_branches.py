@@ -0,0 +1,188 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from celery import Celery
+from celery.canvas import Signature, _chain, group
+
+from config import Config
+from tasks.base_tasks_handler import BaseTaskHandler
+from utils import dbUtils, flowRouter
+from utils.dbUtils import add_lead_branches, end_lead_branches
+
+LEAD = str(ObjectId())
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def _matches(doc, query):
+    for path, condition in query.items():
+        value = _get(doc, path)
+        if isinstance(condition, dict):
+            if "$gte" in condition and (value is None or value < condition["$gte"]):
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeLeads:
+    """The single-document updates dbUtils makes on the leads collection."""
+
+    def __init__(self, *docs):
+        self.docs = list(docs)
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                for field, amount in update.get("$inc", {}).items():
+                    doc[field] = doc.get(field, 0) + amount
+                for field in update.get("$unset", {}):
+                    doc.pop(field, None)
+                doc.update(update.get("$set", {}))
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+
+@pytest.fixture
+def lead(monkeypatch):
+    lead = {"_id": ObjectId(LEAD), "status": 2, "nodeId": "preVerify_1"}
+    leads = FakeLeads(lead)
+    client = SimpleNamespace(get_default_database=lambda: {"leads": leads})
+    monkeypatch.setattr(dbUtils, "get_mongo_client", lambda: client)
+    monkeypatch.setattr(dbUtils, "flush_lead_updates", lambda: 0)
+    return lead
+
+
+def test_lead_without_branches_finishes_with_its_only_branch(lead):
+    assert end_lead_branches(LEAD, 1, "sendWebhook_1") is True
+    assert lead["status"] == 9
+    assert lead["nodeId"] == "sendWebhook_1"
+
+
+def test_only_the_last_branch_finishes_the_lead(lead):
+    add_lead_branches(LEAD, 2)
+
+    assert end_lead_branches(LEAD, 1, "sendWebhook_1") is False
+    assert end_lead_branches(LEAD, 1, "sendWebhook_2") is False
+    assert lead["status"] == 2
+
+    assert end_lead_branches(LEAD, 1, "sendWebhook_3") is True
+    assert lead["status"] == 9
+    assert lead["nodeId"] == "sendWebhook_3"
+    assert "extraBranches" not in lead
+
+
+def test_stopped_chain_ends_every_branch_below_it(lead):
+    add_lead_branches(LEAD, 2)
+
+    # A node two leaves deep stopped without publishing, without finishing the lead
+    assert end_lead_branches(LEAD, 2, "googleCalendar_1", finish=False) is False
+    assert end_lead_branches(LEAD, 1, "sendWebhook_3") is True
+    assert lead["status"] == 9
+
+
+def test_failed_branch_keeps_the_lead_from_finishing(lead):
+    add_lead_branches(LEAD, 1)
+    lead.update(status=0, error={"status": True})
+
+    assert end_lead_branches(LEAD, 1, "sendWebhook_1", finish=False) is False
+    assert end_lead_branches(LEAD, 1, "sendWebhook_2") is True
+    assert lead["status"] == 0
+
+
+@pytest.fixture
+def flow():
+    # preVerify_1 -> googleCalendar_1 -> (sendWebhook_1, sendWebhook_2) and preVerify_1 -> sendWebhook_3
+    return SimpleNamespace(version="v1", status=1, routes={
+        "start_1": [{"target": "preVerify_1"}],
+        "preVerify_1": [{"target": "googleCalendar_1"}, {"target": "sendWebhook_3"}],
+        "googleCalendar_1": [{"target": "sendWebhook_1"}, {"target": "sendWebhook_2"}],
+    })
+
+
+MESSAGE = {"leadId": LEAD, "flowId": "flow-1", "userId": "user-1", "targetNode": "start_1"}
+
+
+def test_chained_node_carries_the_branches_below_it(flow):
+    signature, leaves = flowRouter.downstream_signature(Celery(), MESSAGE, "preVerify_1", flow)
+
+    assert leaves == 3
+    node, successors = signature.tasks
+    assert node.kwargs["message"]["branches"] == 3
+    calendar = successors.tasks[0].tasks[0]
+    assert calendar.kwargs["message"]["branches"] == 2
+
+
+def test_publish_next_counts_branches_before_sending(flow, monkeypatch):
+    counted, sent = [], []
+    monkeypatch.setattr(Config, "FLOW_ROUTING_MODE", "broker")
+    monkeypatch.setattr(flowRouter, "add_lead_branches", lambda leadId, count: counted.append(count))
+    for canvas in (Signature, _chain, group):
+        monkeypatch.setattr(canvas, "apply_async", lambda self, *args, **kwargs: sent.append(counted[:]))
+
+    targets = flowRouter.publish_next(Celery(), MESSAGE, flow)
+
+    assert targets == ["preVerify_1"]
+    assert counted == [2]
+    assert sent == [[2]]
+
+
+def test_publish_next_takes_the_branches_back_when_sending_fails(flow, monkeypatch):
+    counted = []
+    monkeypatch.setattr(Config, "FLOW_ROUTING_MODE", "broker")
+    monkeypatch.setattr(Config, "FLOW_ROUTING_HTTP_FALLBACK", False)
+    monkeypatch.setattr(flowRouter, "add_lead_branches", lambda leadId, count: counted.append(count))
+
+    def broker_down(self, *args, **kwargs):
+        raise ConnectionError("broker down")
+
+    for canvas in (Signature, _chain, group):
+        monkeypatch.setattr(canvas, "apply_async", broker_down)
+
+    with pytest.raises(ConnectionError):
+        flowRouter.publish_next(Celery(), MESSAGE, flow)
+    assert counted == [2, -2]
+
+
+app = Celery(set_as_current=False)
+
+
+@app.task(name="tests.node", base=BaseTaskHandler, bind=True)
+def node(self, message, retval=None):
+    return retval
+
+
+NEXT = [{"task": "tasks.sendWebhook", "kwargs": {}}]
+
+
+def call_node(message, retval):
+    node.push_request(chain=list(NEXT))
+    try:
+        node(message=message, retval=retval)
+        return node.request.chain, getattr(node.request, "chain_stopped", False)
+    finally:
+        node.pop_request()
+
+
+def test_chain_continues_when_the_node_publishes():
+    message = dict(MESSAGE, chained=True)
+
+    assert call_node(message, {"isPublish": True, "result": True}) == (NEXT, False)
+
+
+@pytest.mark.parametrize("retval", [None, {"calendar_link": None}, {"isPublish": False}])
+def test_chain_stops_when_the_node_does_not_publish(retval):
+    message = dict(MESSAGE, chained=True)
+
+    assert call_node(message, retval) == (None, True)
+
+
+def test_unchained_node_keeps_its_request():
+    assert call_node(dict(MESSAGE), None) == (NEXT, False)
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+from utils.flowCache import CompiledFlow, FlowCache, version_stamp
+
+UPDATED_AT = datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def compiled(flow_id, updated_at=UPDATED_AT):
+    return CompiledFlow({
+        "_id": flow_id,
+        "updatedAt": updated_at,
+        "status": 1,
+        "nodeData": {"nodes": [{"id": "preVerify_1", "data": {"settings": {"criteria": "x"}}}]},
+        "routeData": [{"source": "preVerify_1", "target": "sendWebhook_1"}],
+    })
+
+
+def test_version_stamp_matches_node_iso_strings():
+    assert version_stamp(UPDATED_AT) == "2026-10-18T12:30:15.123Z"
+
+
+def test_compiled_flow_indexes_settings_and_routes():
+    flow = compiled("f1")
+
+    assert flow.node_settings["preVerify_1"] == {"criteria": "x"}
+    assert flow.routes["preVerify_1"][0]["target"] == "sendWebhook_1"
+
+
+def test_get_drops_entries_at_another_version():
+    cache = FlowCache()
+    cache.put(compiled("f1"))
+
+    assert cache.get("f1", "2026-10-18T12:30:15.123Z") is not None
+    assert cache.get("f1", "2026-10-18T13:00:00.000Z") is None
+    assert cache.get("f1") is None
+
+
+def test_expired_entries_are_misses():
+    cache = FlowCache(ttl=-1)
+    cache.put(compiled("f1"))
+
+    assert cache.get("f1") is None
+
+
+def test_least_recently_used_flow_is_evicted():
+    cache = FlowCache(max_size=2)
+    cache.put(compiled("f1"))
+    cache.put(compiled("f2"))
+    cache.get("f1")
+    cache.put(compiled("f3"))
+
+    assert cache.get("f2") is None
+    assert cache.get("f1") is not None
+    assert cache.get("f3") is not None
+
+
+def test_invalidate_keeps_a_flow_already_at_the_announced_version():
+    cache = FlowCache()
+    cache.put(compiled("f1"))
+
+    cache.invalidate("f1", "2026-10-18T12:30:15.123Z")
+    assert cache.get("f1") is not None
+
+    cache.invalidate("f1", "2026-10-18T13:00:00.000Z")
+    assert cache.get("f1") is None
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from utils import leadWriter
+from utils.leadWriter import LeadWriteBuffer
+
+LEAD_A = str(ObjectId())
+LEAD_B = str(ObjectId())
+
+
+class FakeLeads:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise ConnectionError("mongo down")
+        self.batches.append((operations, ordered))
+        return SimpleNamespace(matched_count=len(operations))
+
+
+@pytest.fixture
+def leads(monkeypatch):
+    leads = FakeLeads()
+    client = SimpleNamespace(get_default_database=lambda: {"leads": leads})
+    monkeypatch.setattr(leadWriter, "get_mongo_client", lambda: client)
+    return leads
+
+
+def writer(max_batch=100):
+    buffer = LeadWriteBuffer(max_batch=max_batch, flush_interval=3600)
+    # No background flusher, the tests flush themselves
+    buffer._flusher = object()
+    return buffer
+
+
+def sets(batch):
+    operations, _ = batch
+    return {str(op._filter["_id"]): op._doc["$set"] for op in operations}
+
+
+def test_updates_to_one_lead_are_merged_field_by_field(leads):
+    buffer = writer()
+    buffer.set(LEAD_A, {"status": 2, "nodeId": "preVerify_1"})
+    buffer.set(LEAD_A, {"status": 3})
+    buffer.set(LEAD_B, {"status": 9})
+
+    assert buffer.flush() == 2
+    assert sets(leads.batches[0]) == {
+        LEAD_A: {"status": 3, "nodeId": "preVerify_1"},
+        LEAD_B: {"status": 9},
+    }
+    assert leads.batches[0][1] is False
+
+
+def test_flush_without_updates_writes_nothing(leads):
+    assert writer().flush() == 0
+    assert leads.batches == []
+
+
+def test_full_buffer_flushes_on_set(leads):
+    buffer = writer(max_batch=2)
+    buffer.set(LEAD_A, {"status": 2})
+    assert leads.batches == []
+
+    buffer.set(LEAD_B, {"status": 2})
+    assert len(leads.batches) == 1
+
+
+def test_failed_flush_keeps_updates_under_newer_ones(leads):
+    buffer = writer()
+    buffer.set(LEAD_A, {"status": 2, "nodeId": "preVerify_1"})
+    leads.fail = True
+    assert buffer.flush() == 0
+
+    leads.fail = False
+    buffer.set(LEAD_A, {"status": 3})
+    assert buffer.flush() == 1
+    assert sets(leads.batches[0]) == {LEAD_A: {"status": 3, "nodeId": "preVerify_1"}}
@@ -0,0 +1,101 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+from celery.exceptions import Retry
+
+import tasks.send_webhook as send_webhook_module
+from tasks.send_webhook import batch_body
+from utils.webhookDelivery import EndpointBusy
+
+task = send_webhook_module.send_webhook
+
+LINES = [json.dumps({"leadId": "a"}).encode(), json.dumps({"leadId": "b"}).encode()]
+MESSAGE = {"leadId": "lead-1", "flowId": "flow-1", "userId": "user-1", "targetNode": "sendWebhook_1"}
+
+
+class FakeDelivery:
+    def __init__(self, error):
+        self.error = error
+
+    def post(self, url, data, headers=None):
+        raise self.error
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Runs the task body the way a worker runs its nth retry; sent holds the retries it publishes."""
+    sent = []
+    context = SimpleNamespace(lead={"leadData": {"email": "lead@example.com"}},
+                              settings={"webhookUrl": "https://hooks.example.com/lead"})
+    monkeypatch.setattr(task, "get_context", lambda message: context)
+    monkeypatch.setattr(task, "apply_async", lambda args=None, kwargs=None, **options: sent.append(kwargs))
+
+    def run(error, message, retries):
+        monkeypatch.setattr(send_webhook_module, "webhook_delivery", FakeDelivery(error))
+        task.push_request(id="task-1", retries=retries, called_directly=False, is_eager=False,
+                          args=[], kwargs={"message": message}, delivery_info={})
+        try:
+            return task.run(message=message)
+        finally:
+            task.pop_request()
+
+    return SimpleNamespace(run=run, sent=sent)
+
+
+def test_deferral_is_counted_in_the_message(worker):
+    with pytest.raises(Retry):
+        worker.run(EndpointBusy("busy", retry_after=1), dict(MESSAGE), retries=0)
+
+    assert worker.sent == [{"message": dict(MESSAGE, deferrals=1)}]
+
+
+def test_deferrals_beyond_max_retries_are_still_retried(worker):
+    deferrals = task.max_retries + 3
+    message = dict(MESSAGE, deferrals=deferrals)
+
+    with pytest.raises(Retry):
+        worker.run(EndpointBusy("busy", retry_after=1), message, retries=deferrals)
+
+    assert worker.sent == [{"message": dict(MESSAGE, deferrals=deferrals + 1)}]
+
+
+def test_failed_requests_after_deferrals_get_the_full_budget(worker):
+    deferrals = task.max_retries + 3
+    message = dict(MESSAGE, deferrals=deferrals)
+
+    # Every retry so far was a deferral, so this is the first failed request
+    with pytest.raises(Retry):
+        worker.run(requests.exceptions.ConnectionError("refused"), message, retries=deferrals)
+    assert len(worker.sent) == 1
+
+
+def test_failed_requests_stop_at_max_retries(worker):
+    message = dict(MESSAGE, deferrals=2)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        worker.run(requests.exceptions.ConnectionError("refused"), message, retries=task.max_retries + 2)
+    assert worker.sent == []
+
+
+def test_json_batch_wraps_leads_with_a_timestamp():
+    body = json.loads(b"".join(batch_body("json", LINES)))
+
+    assert body["leads"] == [{"leadId": "a"}, {"leadId": "b"}]
+    assert "timestamp" in body
+
+
+def test_array_batch_is_a_bare_list():
+    assert json.loads(b"".join(batch_body("array", LINES))) == [{"leadId": "a"}, {"leadId": "b"}]
+
+
+def test_ndjson_batch_has_one_lead_per_line():
+    lines = b"".join(batch_body("ndjson", LINES)).splitlines()
+
+    assert [json.loads(line) for line in lines] == [{"leadId": "a"}, {"leadId": "b"}]
+
+
+def test_empty_batch_is_still_valid_json():
+    assert json.loads(b"".join(batch_body("array", []))) == []
+    assert json.loads(b"".join(batch_body("json", [])))["leads"] == []
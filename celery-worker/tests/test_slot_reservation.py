@@ -0,0 +1,112 @@
+import operator
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from utils import slotReservation
+from utils.slotReservation import claim_first_free, claim_slot, get_reserved_slots, release_slot
+
+USER = str(ObjectId())
+CONNECTION = "connection-1"
+START = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+
+_OPERATORS = {"$ne": operator.ne, "$lt": operator.lt, "$gt": operator.gt}
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if not all(_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeReservations:
+    """The calendarReservations operations slotReservation makes, with its unique (connectionId, start) index."""
+
+    def __init__(self):
+        self.docs = []
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def insert_one(self, doc):
+        if any(d["connectionId"] == doc["connectionId"] and d["start"] == doc["start"] for d in self.docs):
+            raise DuplicateKeyError("duplicate slot")
+        doc = dict(doc, _id=ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    def find(self, query, projection=None):
+        return [doc for doc in self.docs if _matches(doc, query)]
+
+    def find_one(self, query):
+        return next(iter(self.find(query)), None)
+
+    def update_one(self, query, update):
+        for doc in self.find(query)[:1]:
+            doc.update(update["$set"])
+
+    def delete_one(self, query):
+        for doc in self.find(query)[:1]:
+            self.docs.remove(doc)
+
+
+@pytest.fixture(autouse=True)
+def reservations(monkeypatch):
+    reservations = FakeReservations()
+    client = SimpleNamespace(get_default_database=lambda: {"calendarReservations": reservations})
+    monkeypatch.setattr(slotReservation, "get_mongo_client", lambda: client)
+    return reservations
+
+
+def claim(start, minutes=30):
+    return claim_slot(USER, CONNECTION, str(ObjectId()), start, start + timedelta(minutes=minutes))
+
+
+def test_same_start_is_claimed_once():
+    assert claim(START) is not None
+    assert claim(START) is None
+
+
+def test_overlapping_slot_of_another_length_is_refused_and_not_kept(reservations):
+    assert claim(START, minutes=60) is not None
+
+    assert claim(START + timedelta(minutes=30)) is None
+    assert len(reservations.docs) == 1
+
+
+def test_adjacent_slot_can_be_claimed():
+    assert claim(START) is not None
+    assert claim(START + timedelta(minutes=30)) is not None
+
+
+def test_released_slot_can_be_claimed_again():
+    reservation = claim(START)
+    release_slot(reservation)
+
+    assert claim(START) is not None
+
+
+def test_claim_first_free_skips_claimed_candidates():
+    claim(START)
+    candidates = [START, START + timedelta(minutes=30)]
+
+    start, reservation = claim_first_free(USER, CONNECTION, str(ObjectId()), candidates, 30)
+
+    assert start == START + timedelta(minutes=30)
+    assert reservation is not None
+    assert claim_first_free(USER, CONNECTION, str(ObjectId()), candidates, 30) == (None, None)
+
+
+def test_reserved_slots_are_busy_for_other_tasks():
+    claim(START)
+
+    assert get_reserved_slots(CONNECTION) == [(START, START + timedelta(minutes=30))]
+    assert get_reserved_slots("other-connection") == []
@@ -0,0 +1,37 @@
+import pytest
+
+from utils import urlSafety
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    urlSafety._positive.clear()
+    urlSafety._negative.clear()
+
+
+def test_verdict_covers_the_page_and_its_host():
+    urlSafety.store_verdict("https://shop.example.com/products", {"isValid": True})
+
+    assert urlSafety.get_cached_verdict("shop.example.com/other") == {"isValid": True}
+    assert urlSafety.get_cached_verdict("https://example.com") is None
+
+
+@pytest.mark.parametrize("is_valid", [True, False])
+def test_sites_of_a_shared_domain_are_judged_separately(is_valid):
+    urlSafety.store_verdict("https://foo.github.io/", {"isValid": is_valid})
+
+    assert urlSafety.get_cached_verdict("https://bar.github.io/") is None
+    assert urlSafety.get_cached_verdict("https://github.io/") is None
+
+
+def test_newer_verdict_replaces_the_other_kind():
+    urlSafety.store_verdict("https://example.com/a", {"isValid": False, "reason": "Scam"})
+    urlSafety.store_verdict("https://example.com/a", {"isValid": True})
+
+    assert urlSafety.get_cached_verdict("https://example.com/a") == {"isValid": True}
+
+
+def test_prefilter_rejects_ip_addresses_and_malformed_urls():
+    assert urlSafety.prefilter("http://10.0.0.1/admin")["isValid"] is False
+    assert urlSafety.prefilter("not a url")["isValid"] is False
+    assert urlSafety.prefilter("https://example.com") is None
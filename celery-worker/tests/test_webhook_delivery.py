@@ -0,0 +1,17 @@
+import random
+
+from utils.webhookDelivery import backoff_delay
+
+
+def test_backoff_delay_uses_full_jitter(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+
+    backoff_delay(0, base=2, cap=600)
+    backoff_delay(3, base=2, cap=600)
+
+    assert bounds == [(0, 2), (0, 16)]
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(20, base=2, cap=60) <= 60 for _ in range(100))
@@ -0,0 +1,78 @@
+import threading
+
+
+class _Batch:
+    def __init__(self, max_size, max_bytes, max_wait):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+        self.items = []
+        self.bytes = 0
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collect items submitted under the same key by concurrent tasks and handle them as one batch.
+
+    flush_fn(key, items) must return one result per item, in order. The first
+    submitter of a batch waits up to max_wait seconds for others to join, and
+    a batch reaching max_size items (or max_bytes, counting the size each
+    submitter passes) is flushed straight away. The limits can be overridden
+    per batch by its first submitter. Each submit call blocks until its batch
+    is done and returns its own result, or re-raises the batch's exception.
+    """
+
+    def __init__(self, flush_fn, max_size=20, max_wait=1.0, max_bytes=None):
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.max_bytes = max_bytes
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, item, size=0, max_size=None, max_bytes=None, max_wait=None):
+        with self._lock:
+            batch = self._pending.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = _Batch(
+                    max_size or self.max_size,
+                    max_bytes or self.max_bytes,
+                    self.max_wait if max_wait is None else max_wait,
+                )
+                self._pending[key] = batch
+            index = len(batch.items)
+            batch.items.append(item)
+            batch.bytes += size
+            is_full = len(batch.items) >= batch.max_size or (
+                batch.max_bytes is not None and batch.bytes >= batch.max_bytes)
+            if is_full:
+                del self._pending[key]
+
+        if is_full:
+            self._run(key, batch)
+        elif is_leader and not batch.done.wait(batch.max_wait):
+            with self._lock:
+                owns_batch = self._pending.get(key) is batch
+                if owns_batch:
+                    del self._pending[key]
+            if owns_batch:
+                self._run(key, batch)
+
+        batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _run(self, key, batch):
+        try:
+            results = self.flush_fn(key, batch.items)
+            if len(results) != len(batch.items):
+                raise ValueError(f"Batch returned {len(results)} results for {len(batch.items)} items.")
+            batch.results = results
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
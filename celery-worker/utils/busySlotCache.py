@@ -0,0 +1,60 @@
+import threading
+import time
+
+from config import Config
+from utils.calendarTimeUtil import get_busy_slots_multi
+
+
+class BusySlotCache:
+    """Short-lived busy intervals per calendar connection.
+
+    Leads booked against the same connection within the TTL share one
+    freebusy query. Events this worker inserts are added to the cached
+    intervals right away, so the next lead does not see the slot as free.
+    """
+
+    def __init__(self, ttl=120, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_busy_slots(self, service, userId, connectionId, calendar_ids, days_ahead):
+        """Union of busy intervals across calendar_ids, fetched with one freebusy query on a miss."""
+        key = (str(userId), connectionId, tuple(calendar_ids), days_ahead)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                return list(entry[1])
+
+        busy_by_calendar = get_busy_slots_multi(service, calendar_ids, days_ahead)
+        busy_slots = [slot for calendar_id in calendar_ids for slot in busy_by_calendar[calendar_id]]
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+            self._entries[key] = (time.monotonic(), busy_slots)
+        return list(busy_slots)
+
+    def add_busy(self, userId, connectionId, start, end):
+        """Record an event this worker just booked on every cached entry of the connection."""
+        with self._lock:
+            for key, (fetched_at, busy_slots) in self._entries.items():
+                if key[0] == str(userId) and key[1] == connectionId:
+                    busy_slots.append((start, end))
+
+    def invalidate(self, userId, connectionId):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == str(userId) and key[1] == connectionId]:
+                del self._entries[key]
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if now - entry[0] > self.ttl]:
+            del self._entries[key]
+        # Still full: drop the oldest entries
+        while len(self._entries) >= self.max_entries:
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+
+
+busy_slot_cache = BusySlotCache(Config.CALENDAR_BUSY_CACHE_TTL, Config.CALENDAR_BUSY_CACHE_SIZE)
@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import google_auth_httplib2
+import httplib2
+from bson import ObjectId
+from cachetools import TTLCache
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from config import Config
+from db import get_mongo_client
+from utils import httpClient
+from utils.dbUtils import get_user_calendar_conn, update_tokens
+
+
+def token_expiry(tokens):
+    """Expiry as the naive UTC datetime google-auth expects; the server stores epoch milliseconds."""
+    expiry = tokens.get('expiry_date')
+    if isinstance(expiry, datetime):
+        return expiry.astimezone(timezone.utc).replace(tzinfo=None) if expiry.tzinfo else expiry
+    if isinstance(expiry, (int, float)):
+        return datetime.fromtimestamp(expiry / 1000, timezone.utc).replace(tzinfo=None)
+    return None
+
+def create_credentials(tokens):
+    """Create Google API credentials."""
+    return Credentials(
+        tokens['access_token'],
+        refresh_token=tokens['refresh_token'],
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=Config.GOOGLE_CLIENT_ID,
+        client_secret=Config.GOOGLE_CLIENT_SECRET,
+        expiry=token_expiry(tokens)
+    )
+
+
+def _acquire_refresh_lease(userId, connectionId):
+    """Take the right to refresh a connection's tokens; False while another worker holds it."""
+    now = datetime.now(timezone.utc)
+    result = get_mongo_client().get_default_database()["users"].update_one(
+        {
+            "_id": ObjectId(userId),
+            "calendarConnection": {"$elemMatch": {
+                "profile.id": connectionId,
+                "$or": [{"refreshLeaseUntil": {"$exists": False}}, {"refreshLeaseUntil": {"$lt": now}}],
+            }},
+        },
+        {"$set": {"calendarConnection.$.refreshLeaseUntil": now + timedelta(seconds=Config.TOKEN_REFRESH_LEASE)}}
+    )
+    return result.modified_count == 1
+
+def _release_refresh_lease(userId, connectionId):
+    get_mongo_client().get_default_database()["users"].update_one(
+        {"_id": ObjectId(userId)},
+        {"$unset": {"calendarConnection.$[c].refreshLeaseUntil": ""}},
+        array_filters=[{"c.profile.id": connectionId}]
+    )
+
+
+class CalendarClient:
+    """Credentials and Calendar API services of one calendar connection.
+
+    The credentials object is shared, so a token refreshed by one task is used
+    by the next. Services are pooled because each owns an httplib2 transport,
+    which must not be used by two greenlets at once; the transport carries its
+    own timeout instead of the process-wide socket default.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = dict(tokens)
+        self.credentials = create_credentials(tokens)
+        self._services = queue.LifoQueue()
+        self._refresh_lock = threading.Lock()
+
+    def sync_tokens(self, tokens):
+        """Pick up tokens another worker refreshed and stored since this client was built."""
+        if tokens['access_token'] == self.tokens['access_token']:
+            return
+        self.credentials.token = tokens['access_token']
+        self.credentials.expiry = token_expiry(tokens)
+        self.tokens = dict(tokens)
+
+    def ensure_fresh(self, userId, connectionId):
+        """Refresh an expired access token, once per connection however many tasks need it.
+
+        Greenlets of this worker wait on the client's lock. Other workers are
+        kept out by a lease on the connection in the users collection; they
+        poll for the tokens the lease holder stores instead of sending their
+        own refresh request, which would invalidate the holder's token.
+        """
+        if self.credentials.valid:
+            return
+        with self._refresh_lock:
+            # Refreshed by another greenlet while this one waited
+            if self.credentials.valid:
+                return
+            while not _acquire_refresh_lease(userId, connectionId):
+                time.sleep(0.5)
+                conn = get_user_calendar_conn({'userId': userId}, connectionId)
+                if conn:
+                    self.sync_tokens(conn['tokens'])
+                if self.credentials.valid:
+                    return
+
+            try:
+                self.credentials.refresh(Request(session=httpClient.get_session()))
+            except Exception:
+                _release_refresh_lease(userId, connectionId)
+                raise
+            tokens = {
+                'access_token': self.credentials.token,
+                'refresh_token': self.credentials.refresh_token,
+                'expiry_date': self.credentials.expiry,
+            }
+            # Also drops the lease
+            update_tokens(userId, connectionId, tokens)
+            self.mark_stored(tokens)
+
+    def token_refreshed(self):
+        return self.credentials.token != self.tokens['access_token']
+
+    def mark_stored(self, tokens):
+        self.tokens = dict(tokens)
+
+    @contextmanager
+    def service(self):
+        try:
+            service = self._services.get_nowait()
+        except queue.Empty:
+            service = self._build_service()
+        try:
+            yield service
+        finally:
+            self._services.put(service)
+
+    def _build_service(self):
+        http = google_auth_httplib2.AuthorizedHttp(
+            self.credentials, http=httplib2.Http(timeout=Config.GOOGLE_API_TIMEOUT))
+        return build('calendar', 'v3', http=http, cache_discovery=False)
+
+
+class CalendarClientCache:
+    """CalendarClient per (user, connection), rebuilt after the TTL or when the connection is re-authorized."""
+
+    def __init__(self, max_size=200, ttl=3600):
+        self._clients = TTLCache(maxsize=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, userId, connectionId, tokens):
+        key = (str(userId), connectionId)
+        with self._lock:
+            client = self._clients.get(key)
+            # A new refresh token means the user connected the calendar again
+            if client is None or client.tokens['refresh_token'] != tokens['refresh_token']:
+                client = CalendarClient(tokens)
+                self._clients[key] = client
+            else:
+                client.sync_tokens(tokens)
+        return client
+
+    def invalidate(self, userId, connectionId):
+        with self._lock:
+            self._clients.pop((str(userId), connectionId), None)
+
+
+calendar_clients = CalendarClientCache(Config.CALENDAR_CLIENT_CACHE_SIZE, Config.CALENDAR_CLIENT_CACHE_TTL)
@@ -1,5 +1,6 @@
 import json
 import requests
+from bisect import bisect_right
 from datetime import datetime, timedelta, time, timezone
 from datetime import datetime, timedelta
 
@@ -7,9 +8,30 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python sweep gives the same answers
+    np = None
+
+# How far ahead busy slots are fetched and free slots are searched
+DEFAULT_HORIZON_DAYS = 14
+
+# Above this many busy intervals the NumPy path is used when available
+NUMPY_MIN_BUSY = 200
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 #--------------- Get available time slots ---------------#
-def get_busy_slots(service, calendar_id='primary', days_ahead=14):
+def get_busy_slots(service, calendar_id='primary', days_ahead=DEFAULT_HORIZON_DAYS):
+    return get_busy_slots_multi(service, [calendar_id], days_ahead)[calendar_id]
+
+def get_busy_slots_multi(service, calendar_ids, days_ahead=DEFAULT_HORIZON_DAYS):
+    """Busy intervals for several calendars with a single freebusy query, keyed by calendar id.
+
+    Raises ValueError when Google reports an error for one of the calendars
+    (not found, no access), rather than treating it as free.
+    """
     now = datetime.now(timezone.utc)  # Make now timezone-aware
     time_min = now.isoformat()
     time_max = (now + timedelta(days=days_ahead)).isoformat()
@@ -18,16 +40,22 @@ def get_busy_slots(service, calendar_id='primary', days_ahead=14):
         "timeMin": time_min,
         "timeMax": time_max,
         "timeZone": "UTC",
-        "items": [{"id": calendar_id}]
+        "items": [{"id": calendar_id} for calendar_id in calendar_ids]
     }).execute()
 
-    busy = events_result['calendars'][calendar_id].get('busy', [])
-    busy_slots = [
-        (datetime.fromisoformat(b['start'].replace('Z', '+00:00')),
-         datetime.fromisoformat(b['end'].replace('Z', '+00:00')))
-        for b in busy
-    ]
-    return busy_slots
+    busy_by_calendar = {}
+    for calendar_id in calendar_ids:
+        calendar = events_result['calendars'].get(calendar_id, {})
+        if calendar.get('errors'):
+            reasons = ", ".join(error.get('reason', 'unknown') for error in calendar['errors'])
+            raise ValueError(f"Free/busy unavailable for calendar {calendar_id}: {reasons}")
+        busy = calendar.get('busy', [])
+        busy_by_calendar[calendar_id] = [
+            (datetime.fromisoformat(b['start'].replace('Z', '+00:00')),
+             datetime.fromisoformat(b['end'].replace('Z', '+00:00')))
+            for b in busy
+        ]
+    return busy_by_calendar
 
 def get_working_days(start_date, startWeekday = 0, endWeekday = 4, num_days=7):
     days = []
@@ -58,15 +86,94 @@ def is_time_slot_available(slot_start, slot_end, busy_slots):
             return False
     return True
 
-def find_nearest_available_slot(busy_slots, startWeekday =0, endWeekday=4, start_hour=8, end_hour=17, interval=60):
-    now = datetime.now(timezone.utc)  # Make now timezone-aware
-    working_days = get_working_days(now, startWeekday, endWeekday)
+def merge_busy_intervals(busy_slots, buffer_minutes=0):
+    """Sort busy intervals, pad each by buffer_minutes on both sides and merge overlaps."""
+    buffer = timedelta(minutes=buffer_minutes)
+    merged = []
+    for busy_start, busy_end in sorted(busy_slots):
+        busy_start, busy_end = busy_start - buffer, busy_end + buffer
+        if merged and busy_start <= merged[-1][1]:
+            if busy_end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], busy_end)
+        else:
+            merged.append((busy_start, busy_end))
+    return merged
 
-    for day in working_days:
-        slots = generate_time_slots(day, start_hour, end_hour, interval)
-        for slot_start, slot_end in slots:
-            if slot_start < now:
+def _working_windows(now, startWeekday, endWeekday, start_hour, end_hour, horizon_days):
+    for day in get_working_days(now, startWeekday, endWeekday, horizon_days):
+        window_start = datetime.combine(day.date(), start_hour, tzinfo=timezone.utc)
+        window_end = datetime.combine(day.date(), end_hour, tzinfo=timezone.utc)
+        if window_end <= window_start:
+            # Hours converted to UTC can wrap past midnight
+            window_end += timedelta(days=1)
+        yield window_start, window_end
+
+def _sweep_free_slots(windows, merged, now, interval, count):
+    slot_length = timedelta(minutes=interval)
+    busy_ends = [busy_end for _, busy_end in merged]
+    free = []
+    for window_start, window_end in windows:
+        current = window_start
+        while current < window_end:
+            slot_end = current + slot_length
+            if current < now:
+                current = slot_end
+                continue
+            # First busy interval that ends after the slot starts is the only one that can overlap it
+            index = bisect_right(busy_ends, current)
+            if index < len(merged) and merged[index][0] < slot_end:
+                # Jump to the first slot on the grid that starts after this busy interval
+                skipped = -(-(merged[index][1] - current) // slot_length)
+                current += slot_length * max(skipped, 1)
                 continue
-            if is_time_slot_available(slot_start, slot_end, busy_slots):
-                return slot_start
-    return None
\ No newline at end of file
+            free.append(current)
+            if len(free) >= count:
+                return free
+            current = slot_end
+    return free
+
+def _to_micros(value):
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+def _numpy_free_slots(windows, merged, now, interval, count):
+    slot_micros = interval * 60 * 1000000
+    starts = []
+    for window_start, window_end in windows:
+        first, last = _to_micros(window_start), _to_micros(window_end)
+        starts.append(np.arange(first, last, slot_micros, dtype=np.int64))
+    if not starts:
+        return []
+
+    starts = np.concatenate(starts)
+    ends = starts + slot_micros
+    busy_starts = np.array([_to_micros(busy_start) for busy_start, _ in merged], dtype=np.int64)
+    busy_ends = np.array([_to_micros(busy_end) for _, busy_end in merged], dtype=np.int64)
+
+    index = np.searchsorted(busy_ends, starts, side='right')
+    overlapping = index < len(merged)
+    overlapping[overlapping] = busy_starts[index[overlapping]] < ends[overlapping]
+    free = starts[~overlapping & (starts >= _to_micros(now))][:count]
+    return [_EPOCH + timedelta(microseconds=int(micros)) for micros in free]
+
+def find_available_slots(busy_slots, startWeekday=0, endWeekday=4, start_hour=time(8), end_hour=time(17),
+                         interval=60, count=1, horizon_days=DEFAULT_HORIZON_DAYS, buffer_minutes=0, now=None):
+    """Return the start times of the first `count` free slots within the horizon.
+
+    Slots sit on the same grid as generate_time_slots (start_hour + k * interval).
+    Busy intervals are merged once, so each slot is checked with a binary search
+    instead of a scan of every busy interval; with NumPy installed and a busy
+    calendar the whole horizon is checked at once.
+    """
+    now = now or datetime.now(timezone.utc)  # Make now timezone-aware
+    merged = merge_busy_intervals(busy_slots, buffer_minutes)
+    windows = list(_working_windows(now, startWeekday, endWeekday, start_hour, end_hour, horizon_days))
+
+    if np is not None and len(merged) >= NUMPY_MIN_BUSY:
+        return _numpy_free_slots(windows, merged, now, interval, count)
+    return _sweep_free_slots(windows, merged, now, interval, count)
+
+def find_nearest_available_slot(busy_slots, startWeekday =0, endWeekday=4, start_hour=8, end_hour=17, interval=60,
+                                horizon_days=DEFAULT_HORIZON_DAYS, buffer_minutes=0):
+    slots = find_available_slots(busy_slots, startWeekday, endWeekday, start_hour, end_hour, interval,
+                                 count=1, horizon_days=horizon_days, buffer_minutes=buffer_minutes)
+    return slots[0] if slots else None
\ No newline at end of file
@@ -1,47 +1,102 @@
 from db import get_mongo_client
 from bson import ObjectId
+from utils.flowCache import CompiledFlow, flow_cache
+from utils.leadWriter import lead_writer
 
-def get_flow(message):
+# Only the parts of a flow document the workers actually read
+FLOW_PROJECTION = {
+    "nodeData.nodes.id": 1,
+    "nodeData.nodes.data.settings": 1,
+    "routeData": 1,
+    "status": 1,
+    "updatedAt": 1,
+}
+
+LEAD_PROJECTION = {
+    "leadData": 1,
+    "status": 1,
+    "nodeId": 1,
+}
+
+
+class LeadContext:
+    """Flow, node settings, outgoing routes and lead for one task message.
+
+    Every piece is fetched lazily and at most once, so the task body and the
+    BaseTaskHandler hooks can share the same documents instead of each doing
+    their own find_one.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self._flow = None
+        self._lead = None
+
+    @property
+    def flow(self):
+        """CompiledFlow for the message, served from the in-process flow cache."""
+        if self._flow is None:
+            self._flow = get_compiled_flow(self.message)
+        return self._flow
+
+    @property
+    def settings(self):
+        return find_node_settings(self.flow, self.message["targetNode"])
+
+    @property
+    def routes(self):
+        """Routes leaving the node this message targets."""
+        return self.flow.routes.get(self.message["targetNode"], [])
+
+    @property
+    def lead(self):
+        if self._lead is None:
+            self._lead = get_lead(self.message, projection=LEAD_PROJECTION)
+        return self._lead
+
+
+def get_flow(message, projection=None):
     client = get_mongo_client()
     db = client.get_default_database()
     collection = db["flows"]
     
-    flow = collection.find_one({"_id": ObjectId(message['flowId'])})
+    flow = collection.find_one({"_id": ObjectId(message['flowId'])}, projection)
     if not flow:
         raise ValueError(f"Flow with ID {message.get('flowId')} not found.")
     
     return flow
 
-def get_lead(message):
+def get_lead(message, projection=None):
     client = get_mongo_client()
     db = client.get_default_database()
     collection = db["leads"]
     
-    lead = collection.find_one({"_id": ObjectId(message['leadId'])})
+    lead = collection.find_one({"_id": ObjectId(message['leadId'])}, projection)
     if not lead:
         raise ValueError(f"Lead with ID {message.get('leadId')} not found.")
     
     return lead
 
+def get_compiled_flow(message):
+    """Return the CompiledFlow for message['flowId'], loading it on a cache miss.
+
+    When the message carries the flow's version stamp, a cached copy with a
+    different version is treated as a miss.
+    """
+    flow_id = str(message['flowId'])
+    compiled = flow_cache.get(flow_id, message.get('flowVersion'))
+    if compiled is None:
+        compiled = CompiledFlow(get_flow(message, projection=FLOW_PROJECTION))
+        flow_cache.put(compiled)
+    return compiled
+
 def get_node_settings(message):
-    client = get_mongo_client()
-    db = client.get_default_database()
-    collection = db["flows"]
-    
-    flow = collection.find_one({"_id": ObjectId(message['flowId'])})
-    if not flow:
-        raise ValueError(f"Flow with ID {message.get('flowId')} not found.")
-    
-    nodes = flow["nodeData"]["nodes"]
-    settings = {}
-    for node in nodes:
-        if node["id"] == message["targetNode"]:
-            node_data = node
-            settings = node_data["data"]["settings"]
-            # print (f"questions: {settings}")
-            break
-    else:
-        raise ValueError(f"Node with ID {message.get('nodeId')} not found.")
+    return find_node_settings(get_compiled_flow(message), message["targetNode"])
+
+def find_node_settings(compiled_flow, nodeId):
+    settings = compiled_flow.node_settings.get(nodeId)
+    if settings is None:
+        raise ValueError(f"Node with ID {nodeId} not found.")
     
     return settings
 
@@ -50,50 +105,47 @@ def get_user_calendar_conn(message, connectionId):
     db = client.get_default_database()
     collection = db["users"]
     
-    user = collection.find_one({"_id": ObjectId(message['userId'])})
+    # Only the matching connection comes back, not every connection of the user
+    user = collection.find_one(
+        {"_id": ObjectId(message['userId'])},
+        {"calendarConnection": {"$elemMatch": {"profile.id": connectionId}}}
+    )
     if not user:
         raise ValueError(f"User with ID {message.get('userId')} not found.")
     
-    connections = user["calendarConnection"]
-    conn = {}
-    for connection in connections:
-        if connection["profile"]["id"] == connectionId:
-            conn = connection
-            # print (f"settings: {conn}")
-            break
-    
-    return conn
+    connections = user.get("calendarConnection", [])
+    return connections[0] if connections else {}
 
 def update_tokens(userId, connectionId, tokens):
     client = get_mongo_client()
     db = client.get_default_database()
     collection = db["users"]
     
-    user = collection.find_one({"_id": ObjectId(userId)})
-    if not user:
+    # Positional update of the one connection, so concurrent writers don't overwrite each other's array
+    result = collection.update_one(
+        {"_id": ObjectId(userId)},
+        {
+            "$set": {
+                "calendarConnection.$[c].tokens.access_token": tokens["access_token"],
+                "calendarConnection.$[c].tokens.refresh_token": tokens["refresh_token"],
+                "calendarConnection.$[c].tokens.expiry_date": tokens["expiry_date"],
+            },
+            "$unset": {"calendarConnection.$[c].refreshLeaseUntil": ""},
+        },
+        array_filters=[{"c.profile.id": connectionId}]
+    )
+    if result.matched_count == 0:
         raise ValueError(f"User with ID {userId} not found.")
-    
-    connections = user["calendarConnection"]
-    for connection in connections:
-        if connection["profile"]["id"] == connectionId:
-            connection["tokens"]["access_token"] = tokens["access_token"]
-            connection["tokens"]["refresh_token"] = tokens["refresh_token"]
-            connection["tokens"]["expiry_date"] = tokens["expiry_date"]
-            break
-    
-    collection.update_one({"_id": ObjectId(userId)}, {"$set": {"calendarConnection": connections}})
-    
+
 def update_lead_status_and_current_node(leadId, status, currentNode):
     client = get_mongo_client()
     db = client.get_default_database()
     collection = db["leads"]
     
-    lead = collection.find_one({"_id": ObjectId(leadId)})
-    if not lead:
+    result = collection.update_one({"_id": ObjectId(leadId)}, {"$set": lead_status_fields(status, currentNode)})
+    if result.matched_count == 0:
         raise ValueError(f"Lead with ID {leadId} not found.")
     
-    collection.update_one({"_id": ObjectId(leadId)}, {"$set": {"status": status, 'nodeId': currentNode}})
-    
     
 
 def update_lead(leadId, data):
@@ -101,12 +153,68 @@ def update_lead(leadId, data):
     db = client.get_default_database()
     collection = db["leads"]
     
-    lead = collection.find_one({"_id": ObjectId(leadId)})
-    if not lead:
-        raise ValueError(f"Lead with ID {leadId} not found.")
-    
     update_fields = {}
     for key, value in data.items():
         update_fields[key] = value
 
-    collection.update_one({"_id": ObjectId(leadId)}, {"$set": update_fields})
\ No newline at end of file
+    result = collection.update_one({"_id": ObjectId(leadId)}, {"$set": update_fields})
+    if result.matched_count == 0:
+        raise ValueError(f"Lead with ID {leadId} not found.")
+
+def lead_status_fields(status, currentNode):
+    # status and nodeId follow the lead's latest node; branchStatus keeps each node's own status,
+    # so parallel branches of a flow don't overwrite each other's
+    return {"status": status, 'nodeId': currentNode, f"branchStatus.{currentNode}": status}
+
+def queue_lead_status_and_current_node(leadId, status, currentNode):
+    """Buffered variant of update_lead_status_and_current_node, written by the next bulk flush."""
+    lead_writer.set(leadId, lead_status_fields(status, currentNode))
+
+def queue_branch_status(leadId, currentNode, status):
+    """Buffered status of one node only, for a node whose successors already write the lead's status."""
+    lead_writer.set(leadId, {f"branchStatus.{currentNode}": status})
+
+def add_lead_branches(leadId, count):
+    """Record count more branches of the lead's flow running side by side (negative to take them back).
+
+    extraBranches is the number of running branches minus one, so a lead
+    that never forked has none and needs no write.
+    """
+    if count == 0:
+        return
+    client = get_mongo_client()
+    db = client.get_default_database()
+    db["leads"].update_one({"_id": ObjectId(leadId)}, {"$inc": {"extraBranches": count}})
+
+def end_lead_branches(leadId, count, currentNode, finish=True):
+    """End count branches of the lead's flow; returns True if no branch of it is left running.
+
+    Only the last branch to end marks the lead finished (status 9), and not
+    when one of its branches failed. finish=False ends the branches without
+    finishing the lead, for a flow that stops early.
+    """
+    # This worker's writes for the ending branches must land before the lead is finished
+    flush_lead_updates()
+    client = get_mongo_client()
+    db = client.get_default_database()
+    collection = db["leads"]
+
+    result = collection.update_one(
+        {"_id": ObjectId(leadId), "extraBranches": {"$gte": count}},
+        {"$inc": {"extraBranches": -count}}
+    )
+    if result.modified_count == 1:
+        return False
+
+    update = {"$unset": {"extraBranches": ""}}
+    if finish:
+        update["$set"] = {"status": 9, 'nodeId': currentNode}
+    collection.update_one({"_id": ObjectId(leadId), "error.status": {"$ne": True}}, update)
+    return True
+
+def queue_lead_update(leadId, data):
+    """Buffered variant of update_lead, written by the next bulk flush."""
+    lead_writer.set(leadId, data)
+
+def flush_lead_updates():
+    return lead_writer.flush()
\ No newline at end of file
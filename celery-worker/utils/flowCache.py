@@ -0,0 +1,120 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from celery import bootsteps
+from kombu import Consumer, Exchange, Queue
+
+from config import Config
+
+# Fanout exchange the Node server publishes to whenever a flow is changed
+FLOW_CACHE_EXCHANGE = "flowCache.invalidate"
+
+
+def version_stamp(value):
+    """Normalize a flow updatedAt value so Mongo datetimes and Node ISO strings compare equal."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+    return str(value)
+
+
+class CompiledFlow:
+    """Flow document reduced to O(1) lookups: node id -> settings and source node -> routes."""
+
+    def __init__(self, flow):
+        self.flow_id = str(flow["_id"])
+        self.version = version_stamp(flow.get("updatedAt"))
+        self.route_data = flow.get("routeData") or []
+        self.status = flow.get("status")
+
+        self.node_settings = {}
+        for node in flow["nodeData"]["nodes"]:
+            self.node_settings[node["id"]] = node.get("data", {}).get("settings", {})
+
+        self.routes = {}
+        for route in self.route_data:
+            self.routes.setdefault(route["source"], []).append(route)
+
+
+class FlowCache:
+    """Bounded LRU cache of CompiledFlow entries with a TTL per entry.
+
+    The TTL only bounds staleness if an invalidation message is missed; the
+    normal path is the fanout message sent by the server on every flow change.
+    """
+
+    def __init__(self, max_size=256, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, flow_id, version=None):
+        with self._lock:
+            entry = self._entries.get(flow_id)
+            if entry is None:
+                return None
+
+            compiled, loaded_at = entry
+            if time.monotonic() - loaded_at > self.ttl:
+                del self._entries[flow_id]
+                return None
+            if version is not None and compiled.version != version_stamp(version):
+                del self._entries[flow_id]
+                return None
+
+            self._entries.move_to_end(flow_id)
+            return compiled
+
+    def put(self, compiled):
+        with self._lock:
+            self._entries[compiled.flow_id] = (compiled, time.monotonic())
+            self._entries.move_to_end(compiled.flow_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, flow_id, version=None):
+        """Drop a flow unless the cached copy is already at the announced version."""
+        with self._lock:
+            entry = self._entries.get(flow_id)
+            if entry is None:
+                return
+            if version is None or entry[0].version != version_stamp(version):
+                del self._entries[flow_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+flow_cache = FlowCache(Config.FLOW_CACHE_MAX_SIZE, Config.FLOW_CACHE_TTL)
+
+
+class FlowCacheInvalidationConsumer(bootsteps.ConsumerStep):
+    """Consume flow change notifications from the fanout exchange.
+
+    Each worker binds its own exclusive queue, so every worker process drops
+    its copy. The cache is per process, which matches the gevent/solo pools
+    the workers run with.
+    """
+
+    def get_consumers(self, channel):
+        queue = Queue(
+            f"{FLOW_CACHE_EXCHANGE}.{uuid.uuid4().hex}",
+            exchange=Exchange(FLOW_CACHE_EXCHANGE, type="fanout", durable=True),
+            exclusive=True,
+            auto_delete=True,
+        )
+        return [Consumer(channel, queues=[queue], callbacks=[self.on_message], accept=["json"])]
+
+    def on_message(self, body, message):
+        data = body.get("data", {}) if isinstance(body, dict) else {}
+        flow_id = data.get("flowId")
+        if flow_id:
+            flow_cache.invalidate(str(flow_id), data.get("version"))
+            print(f"Flow cache invalidated for flow {flow_id}.")
+        message.ack()
@@ -0,0 +1,163 @@
+from celery import chain, group
+from kombu import Exchange
+
+from config import Config
+from utils import httpClient
+from utils import tracing
+from utils.dbUtils import add_lead_branches, end_lead_branches
+
+# Lead publish endpoint of the Node server, used when FLOW_ROUTING_MODE is "http" or the broker fails
+PUBLISH_URL = "http://127.0.0.1:3001/api/lead/publish"
+
+# Nodes whose outcome arrives later through the server (the call result), so nothing is chained after them
+ASYNC_NODE_TYPES = {"aiCall"}
+
+
+def next_targets(routes, result=None):
+    """Node ids the lead moves to after the node the routes leave.
+
+    Every plain route is followed, so branches run side by side; a separate
+    route contributes its success or fail target, like the server's
+    publishLead. Returns [] when the flow ends here.
+    """
+    targets = []
+    for route in routes:
+        if route.get("isSeparate"):
+            if result is None:
+                raise ValueError("Result is required for separate routing.")
+            target = route.get("successTarget") if result else route.get("failTarget")
+        else:
+            target = route.get("target")
+        if target and target not in targets:
+            targets.append(target)
+    return targets
+
+
+def task_for(target):
+    """Celery task name and exchange of a node id such as "sendWebhook_3"."""
+    node_type = target.split("_")[0]
+    return f"tasks.{node_type}", node_type
+
+
+def next_message(message, target, flow_version, chained=False, branches=1):
+    """Message for the next node, in the shape Producer.publishToCelery sends.
+
+    chained marks a node whose successors are already part of the canvas it
+    runs in, so its own on_success must not route the lead again; branches is
+    how many branches of the lead end below it, which stop with it if it
+    doesn't publish.
+    """
+    next_msg = {
+        "leadId": str(message["leadId"]),
+        "flowId": str(message["flowId"]),
+        "userId": str(message["userId"]),
+        "nodeId": message["targetNode"],
+        "targetNode": target,
+        "flowVersion": flow_version,
+    }
+    if chained:
+        next_msg["chained"] = True
+        next_msg["branches"] = branches
+    return next_msg
+
+
+def node_signature(app, message, target, flow_version, chained=False, branches=1):
+    """Immutable signature of the target node's task, sent to the node type's topic exchange
+    with the server's routing key."""
+    task, node_type = task_for(target)
+    exchange = Exchange(node_type, type="topic", durable=True)
+    return app.signature(
+        task,
+        kwargs={"message": next_message(message, target, flow_version, chained, branches)},
+        exchange=exchange,
+        routing_key=f"{message['userId']}.{message['flowId']}.{target}",
+        declare=[exchange],
+        immutable=True,
+    )
+
+
+def downstream_signature(app, message, target, compiled_flow, seen=()):
+    """Canvas for the target node and everything that can be scheduled after it without its result.
+
+    A node whose routes are all plain becomes chain(node, next) or
+    chain(node, group(branches)). A node with a separate route, an async node,
+    a last node or a node already on the path (a loop) ends the canvas and
+    routes the lead itself when it finishes.
+
+    Returns (signature, leaves): leaves is the number of branches of the lead
+    the canvas ends in, one per leaf node.
+    """
+    routes = compiled_flow.routes.get(target, [])
+    node_type = target.split("_")[0]
+    is_leaf = (
+        not routes
+        or node_type in ASYNC_NODE_TYPES
+        or target in seen
+        or any(route.get("isSeparate") for route in routes)
+    )
+    if is_leaf:
+        return node_signature(app, message, target, compiled_flow.version), 1
+
+    # The children are published on behalf of this node, so they come from it
+    node_message = dict(message, targetNode=target)
+    branches, leaves = zip(*[
+        downstream_signature(app, node_message, child, compiled_flow, seen=(*seen, target))
+        for child in next_targets(routes)
+    ])
+    successors = branches[0] if len(branches) == 1 else group(branches)
+    node = node_signature(app, message, target, compiled_flow.version, chained=True, branches=sum(leaves))
+    return chain(node, successors), sum(leaves)
+
+
+def publish_via_api(message, result):
+    response = httpClient.post(PUBLISH_URL, json={
+        "userId": message['userId'],
+        "leadId": message['leadId'],
+        "result": result,
+        "isRetry": False,
+    })
+    return response.json()
+
+
+def publish_next(app, message, compiled_flow, result=None):
+    """Move the lead to the next nodes of its flow.
+
+    Independent branches are sent as a group and plain successors are chained
+    behind their node, so a branching flow takes as long as its slowest path.
+    Returns the target node ids, or [] when the flow is finished for the lead
+    (or the server routed it, in "http" mode).
+
+    The lead's branch that published becomes one branch per leaf of the
+    canvas, counted on the lead so only the last one to end finishes it.
+    """
+    if Config.FLOW_ROUTING_MODE == "http":
+        print(f"Publish lead to next node... {publish_via_api(message, result)}")
+        return []
+
+    if compiled_flow.status == 0:
+        print(f"Flow {message['flowId']} was deleted, lead {message['leadId']} not published.")
+        return []
+
+    targets = next_targets(compiled_flow.routes.get(message["targetNode"], []), result)
+    if not targets:
+        print(f"No config target found for {result} in node {message['targetNode']}")
+        end_lead_branches(message['leadId'], 1, message["targetNode"])
+        return []
+
+    branches, leaves = zip(*[downstream_signature(app, message, target, compiled_flow) for target in targets])
+    # Counted before sending, so a branch can't finish the lead while its siblings are on their way
+    add_lead_branches(message['leadId'], sum(leaves) - 1)
+    try:
+        # Each task of the canvas gets the traceparent header of this span when Celery sends it
+        with tracing.span("publish next nodes", targets=targets):
+            (branches[0] if len(branches) == 1 else group(branches)).apply_async()
+    except Exception as e:
+        add_lead_branches(message['leadId'], 1 - sum(leaves))
+        if not Config.FLOW_ROUTING_HTTP_FALLBACK:
+            raise
+        print(f"Broker publish failed, publishing through the API: {str(e)}")
+        print(f"Publish lead to next node... {publish_via_api(message, result)}")
+        return targets
+
+    print(f"Published lead {message['leadId']} to {', '.join(targets)}.")
+    return targets
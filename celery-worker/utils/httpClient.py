@@ -0,0 +1,94 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from utils import metrics
+from utils import tracing
+
+# Shared by every task in the worker process so connections are kept alive between calls
+_session = None
+_session_lock = threading.Lock()
+
+_latency = {}
+_latency_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=Config.HTTP_POOL_HOSTS,
+                    pool_maxsize=Config.HTTP_POOL_SIZE,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def request(method, url, timeout=None, kind="http", **kwargs):
+    """Send a request through the pooled session and record its latency for the host.
+
+    timeout defaults to (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT); pass a number or
+    a (connect, read) tuple to override it for slow endpoints. kind is "llm" for
+    calls whose time is model inference, so task metrics can tell it apart.
+    """
+    if timeout is None:
+        timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+    host = urlsplit(url).netloc
+    started = time.perf_counter()
+    failed = False
+    with tracing.span(f"HTTP {method} {host}", kind=kind, url=url) as span:
+        # Lets the crewai API and the server continue the lead's trace
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": span.traceparent}
+        try:
+            response = get_session().request(method, url, timeout=timeout, **kwargs)
+            span.attributes["status"] = response.status_code
+            return response
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _record_latency(host, elapsed, failed)
+            metrics.record(kind, elapsed)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def _record_latency(host, elapsed, failed):
+    with _latency_lock:
+        stats = _latency.setdefault(host, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+        if failed:
+            stats["errors"] += 1
+
+
+def get_latency_metrics():
+    """Per-host request count, error count and average/max latency in milliseconds."""
+    with _latency_lock:
+        return {
+            host: {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "avgMs": round(stats["total"] / stats["count"] * 1000, 2),
+                "maxMs": round(stats["max"] * 1000, 2),
+            }
+            for host, stats in _latency.items()
+        }
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from bson import ObjectId
+from celery.signals import worker_process_shutdown, worker_shutdown
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from db import get_mongo_client
+
+
+class LeadWriteBuffer:
+    """Per-worker write-behind buffer for lead $set updates.
+
+    Updates for the same lead are merged field by field, so the last write
+    wins, and are sent as unordered bulk_write batches. A batch is flushed
+    when the buffer reaches max_batch leads, every flush_interval seconds,
+    and on worker shutdown. Flushes are serialized so an older batch can
+    never land after a newer one.
+    """
+
+    def __init__(self, max_batch=100, flush_interval=0.5):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    def set(self, leadId, fields):
+        with self._lock:
+            self._pending.setdefault(str(leadId), {}).update(fields)
+            size = len(self._pending)
+
+        self._ensure_flusher()
+        if size >= self.max_batch:
+            self.flush()
+
+    def flush(self):
+        """Write every pending update and return the number of leads written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            operations = [
+                UpdateOne({"_id": ObjectId(leadId)}, {"$set": fields})
+                for leadId, fields in pending.items()
+            ]
+            try:
+                collection = get_mongo_client().get_default_database()["leads"]
+                result = collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                print(f"Lead bulk write partially failed: {e.details.get('writeErrors')}")
+                return len(operations)
+            except Exception as e:
+                print(f"Lead bulk write failed, keeping {len(pending)} updates buffered: {e}")
+                self._requeue(pending)
+                return 0
+
+            if result.matched_count < len(operations):
+                print(f"Lead bulk write matched {result.matched_count} of {len(operations)} leads.")
+            return len(operations)
+
+    def _requeue(self, pending):
+        with self._lock:
+            for leadId, fields in pending.items():
+                merged = dict(fields)
+                merged.update(self._pending.get(leadId, {}))
+                self._pending[leadId] = merged
+
+    def _ensure_flusher(self):
+        # Started lazily so the thread belongs to the process that runs the tasks
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+                    self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+lead_writer = LeadWriteBuffer(Config.LEAD_WRITE_BATCH_SIZE, Config.LEAD_WRITE_FLUSH_INTERVAL)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_on_shutdown(**kwargs):
+    written = lead_writer.flush()
+    if written:
+        print(f"Flushed {written} buffered lead updates on shutdown.")
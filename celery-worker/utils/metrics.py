@@ -0,0 +1,134 @@
+import functools
+import threading
+import time
+
+from celery.signals import before_task_publish, worker_init
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from pymongo import monitoring
+
+from config import Config
+
+LABELS = ("task", "node")
+
+# Seconds, from a fast Mongo query up to a long crew run
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+QUEUE_WAIT = Histogram("node_task_queue_wait_seconds",
+                       "Time between a node task being published and a worker starting it", LABELS, buckets=_BUCKETS)
+TASK_DURATION = Histogram("node_task_duration_seconds",
+                          "Run time of a node task, hooks included", LABELS, buckets=_BUCKETS)
+DB_TIME = Histogram("node_task_db_seconds",
+                    "MongoDB command time per node task run", LABELS, buckets=_BUCKETS)
+HTTP_TIME = Histogram("node_task_http_seconds",
+                      "External HTTP time per node task run, LLM calls excluded", LABELS, buckets=_BUCKETS)
+LLM_TIME = Histogram("node_task_llm_seconds",
+                     "crewai API and OpenAI time per node task run", LABELS, buckets=_BUCKETS)
+RETRIES = Counter("node_task_retries_total", "Node task retries", LABELS)
+FAILURES = Counter("node_task_failures_total", "Node tasks that failed for good", LABELS)
+IN_FLIGHT = Gauge("node_tasks_in_flight", "Node tasks running in this worker", ("task",))
+
+_local = threading.local()
+
+
+class _Run:
+    """Time one task run spends waiting on each external dependency."""
+
+    def __init__(self, task, node):
+        self.labels = (task, node)
+        self.started = time.perf_counter()
+        self.spent = {"db": 0.0, "http": 0.0, "llm": 0.0}
+        self.lock = threading.Lock()
+
+    def add(self, kind, elapsed):
+        with self.lock:
+            self.spent[kind] += elapsed
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+def record(kind, elapsed):
+    """Charge elapsed seconds of a "db", "http" or "llm" call to the task running in this thread."""
+    run = current_run()
+    if run is not None:
+        run.add(kind, elapsed)
+
+
+def bind(fn):
+    """Wrap fn so calls made from an executor thread are charged to the task that submitted it."""
+    run = current_run()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = current_run()
+        _local.run = run
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.run = previous
+
+    return wrapper
+
+
+def task_started(task, message, published_at=None, retries=0):
+    node = message.get("targetNode", "")
+    _local.run = _Run(task, node)
+    IN_FLIGHT.labels(task).inc()
+    if retries:
+        # A retry's wait includes its countdown, so only first runs count towards queue wait
+        return
+    published_at = published_at or message.get("publishedAt")
+    if published_at:
+        QUEUE_WAIT.labels(task, node).observe(max(time.time() - float(published_at), 0))
+
+
+def task_retried(task, message):
+    RETRIES.labels(task, message.get("targetNode", "")).inc()
+
+
+def task_failed(task, message):
+    FAILURES.labels(task, message.get("targetNode", "")).inc()
+
+
+def task_finished(task):
+    run = current_run()
+    _local.run = None
+    if run is None:
+        return
+    IN_FLIGHT.labels(task).dec()
+    TASK_DURATION.labels(*run.labels).observe(time.perf_counter() - run.started)
+    DB_TIME.labels(*run.labels).observe(run.spent["db"])
+    HTTP_TIME.labels(*run.labels).observe(run.spent["http"])
+    LLM_TIME.labels(*run.labels).observe(run.spent["llm"])
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Charge every MongoDB command to the task that issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("db", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record("db", event.duration_micros / 1e6)
+
+
+@before_task_publish.connect
+def _stamp_published_at(headers=None, **kwargs):
+    # Read back by the consuming task as self.request.published_at, for the queue wait
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@worker_init.connect
+def _start_metrics_server(**kwargs):
+    if not Config.METRICS_PORT:
+        return
+    try:
+        start_http_server(Config.METRICS_PORT)
+        print(f"Metrics available on port {Config.METRICS_PORT}.")
+    except OSError as e:
+        print(f"Metrics server not started on port {Config.METRICS_PORT}: {e}")
@@ -0,0 +1,94 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from db import get_mongo_client
+
+_indexes_ready = False
+_indexes_lock = threading.Lock()
+
+
+def _collection():
+    global _indexes_ready
+    collection = get_mongo_client().get_default_database()["calendarReservations"]
+    if not _indexes_ready:
+        with _indexes_lock:
+            if not _indexes_ready:
+                # One claim per slot start on a calendar connection, whichever worker makes it
+                collection.create_index([("connectionId", ASCENDING), ("start", ASCENDING)], unique=True)
+                collection.create_index([("connectionId", ASCENDING), ("end", ASCENDING)])
+                # Claims only need to outlive the busy slot caches and freebusy lag
+                collection.create_index("expiresAt", expireAfterSeconds=0)
+                _indexes_ready = True
+    return collection
+
+
+def _as_utc(value):
+    # pymongo returns naive datetimes in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def get_reserved_slots(connectionId):
+    """Slots other tasks have claimed and not released, as (start, end) busy intervals."""
+    now = datetime.now(timezone.utc)
+    cursor = _collection().find(
+        {"connectionId": connectionId, "end": {"$gt": now}, "expiresAt": {"$gt": now}},
+        {"start": 1, "end": 1, "_id": 0},
+    )
+    return [(_as_utc(doc["start"]), _as_utc(doc["end"])) for doc in cursor]
+
+
+def claim_slot(userId, connectionId, leadId, start, end):
+    """Atomically claim [start, end) on the connection.
+
+    Returns the reservation id, or None when another task holds a claim that
+    starts at the same time or overlaps the slot.
+    """
+    collection = _collection()
+    now = datetime.now(timezone.utc)
+    try:
+        result = collection.insert_one({
+            "userId": ObjectId(userId),
+            "connectionId": connectionId,
+            "leadId": ObjectId(leadId),
+            "start": start,
+            "end": end,
+            "status": "claimed",
+            "expiresAt": now + timedelta(seconds=Config.CALENDAR_RESERVATION_TTL),
+        })
+    except DuplicateKeyError:
+        return None
+
+    # The unique index only catches equal starts; slots of different lengths can still overlap
+    overlapping = collection.find_one({
+        "_id": {"$ne": result.inserted_id},
+        "connectionId": connectionId,
+        "start": {"$lt": end},
+        "end": {"$gt": start},
+        "expiresAt": {"$gt": now},
+    })
+    if overlapping is not None:
+        release_slot(result.inserted_id)
+        return None
+    return result.inserted_id
+
+
+def confirm_slot(reservationId, eventId):
+    _collection().update_one({"_id": reservationId}, {"$set": {"status": "booked", "eventId": eventId}})
+
+
+def release_slot(reservationId):
+    _collection().delete_one({"_id": reservationId})
+
+
+def claim_first_free(userId, connectionId, leadId, candidates, duration_minute):
+    """Claim the first candidate start that no other task holds; returns (start, reservationId) or (None, None)."""
+    for start in candidates:
+        reservationId = claim_slot(userId, connectionId, leadId, start, start + timedelta(minutes=duration_minute))
+        if reservationId is not None:
+            return start, reservationId
+    return None, None
@@ -0,0 +1,129 @@
+import json
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from celery.signals import before_task_publish
+
+from config import Config
+
+SERVICE_NAME = "celery-worker"
+
+# W3C trace context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_local = threading.local()
+_export_lock = threading.Lock()
+_export_file = None
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def finish(self, error=None):
+        if error is not None:
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        export({
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "service": SERVICE_NAME,
+            "start": self.start,
+            "durationMs": round((time.perf_counter() - self._started) * 1000, 3),
+            "attributes": self.attributes,
+        })
+
+
+def parse_traceparent(value):
+    """Return (trace id, parent span id) of a traceparent header, or (None, None) if it is not one."""
+    match = _TRACEPARENT.match(value.strip().lower()) if isinstance(value, str) else None
+    return match.groups() if match else (None, None)
+
+
+def current_span():
+    return getattr(_local, "span", None)
+
+
+def current_traceparent():
+    span = current_span()
+    return span.traceparent if span is not None else None
+
+
+def start_span(name, traceparent=None, **attributes):
+    """Open a span as the current one; a valid traceparent continues a trace started in another process."""
+    parent = current_span()
+    trace_id, parent_id = parse_traceparent(traceparent)
+    if trace_id is None and parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    span = Span(name, trace_id or secrets.token_hex(16), parent_id, attributes)
+    span.previous = parent
+    _local.span = span
+    return span
+
+
+def end_span(span, error=None):
+    _local.span = span.previous
+    span.finish(error)
+
+
+@contextmanager
+def span(name, traceparent=None, **attributes):
+    current = start_span(name, traceparent, **attributes)
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        end_span(current, error)
+
+
+def bind(fn):
+    """Wrap fn so spans opened from an executor thread nest under the submitting task's span."""
+    parent = current_span()
+
+    def wrapper(*args, **kwargs):
+        previous = current_span()
+        _local.span = parent
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.span = previous
+
+    return wrapper
+
+
+def export(record):
+    """Append a finished span to TRACE_FILE as one JSON line; nothing is written when it is unset."""
+    global _export_file
+    if not Config.TRACE_FILE:
+        return
+    line = json.dumps(record, default=str)
+    with _export_lock:
+        if _export_file is None:
+            _export_file = open(Config.TRACE_FILE, "a", encoding="utf-8")
+        _export_file.write(line + "\n")
+        _export_file.flush()
+
+
+@before_task_publish.connect
+def _inject_traceparent(headers=None, **kwargs):
+    # Read back by the consuming task as self.request.traceparent
+    traceparent = current_traceparent()
+    if headers is not None and traceparent:
+        headers["traceparent"] = traceparent
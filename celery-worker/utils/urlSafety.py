@@ -0,0 +1,78 @@
+import ipaddress
+import threading
+from urllib.parse import urlsplit
+
+from cachetools import TTLCache
+
+from config import Config
+
+_positive = TTLCache(maxsize=Config.URL_VERDICT_CACHE_SIZE, ttl=Config.URL_VERDICT_POSITIVE_TTL)
+_negative = TTLCache(maxsize=Config.URL_VERDICT_CACHE_SIZE, ttl=Config.URL_VERDICT_NEGATIVE_TTL)
+_lock = threading.Lock()
+
+
+def _split(url):
+    if not isinstance(url, str) or not url.strip() or any(ch.isspace() for ch in url.strip()):
+        return None
+    value = url.strip()
+    if "://" not in value:
+        value = f"http://{value}"
+    try:
+        parts = urlsplit(value)
+        host = parts.hostname
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https") or not host:
+        return None
+    return host.lower().rstrip("."), parts.path.rstrip("/")
+
+
+def prefilter(url):
+    """Judge obvious URLs locally; returns a check_url style verdict or None when the LLM must decide."""
+    split = _split(url)
+    if split is None:
+        return {"isValid": False, "reason": "Malformed URL"}
+
+    host, _ = split
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return {"isValid": False, "reason": "IP address instead of domain"}
+    except ValueError:
+        pass
+
+    if host == "localhost" or "." not in host:
+        return {"isValid": False, "reason": "Not a public domain"}
+    if host.rsplit(".", 1)[-1] in Config.URL_BLOCKED_TLDS:
+        return {"isValid": False, "reason": "Untrusted top-level domain"}
+    return None
+
+
+def _keys(url):
+    host, path = _split(url)
+    # Most specific first: exact page, then host. Not the domain: sites of a shared domain
+    # (github.io, blogspot.com) are unrelated, and a guessed eTLD+1 can't tell those apart
+    return [f"{host}{path}", host]
+
+
+def get_cached_verdict(url):
+    if _split(url) is None:
+        return None
+    with _lock:
+        for key in _keys(url):
+            for cache in (_negative, _positive):
+                verdict = cache.get(key)
+                if verdict is not None:
+                    return verdict
+    return None
+
+
+def store_verdict(url, verdict):
+    """Remember a verdict for the page and its host."""
+    if _split(url) is None:
+        return
+    is_valid = verdict.get("isValid", False)
+    cache, other = (_positive, _negative) if is_valid else (_negative, _positive)
+    with _lock:
+        for key in _keys(url):
+            cache[key] = verdict
+            other.pop(key, None)
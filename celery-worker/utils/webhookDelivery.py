@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from config import Config
+from utils import httpClient
+
+
+class DeliveryDeferred(Exception):
+    """The endpoint cannot take the request now; retry the task after retry_after seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EndpointBusy(DeliveryDeferred):
+    pass
+
+
+class CircuitOpen(DeliveryDeferred):
+    pass
+
+
+class PermanentDeliveryError(Exception):
+    """The endpoint rejected the payload (4xx other than 408/429); retrying won't help."""
+
+
+def backoff_delay(retries, base=None, cap=None):
+    """Exponential backoff with full jitter, so retries against one endpoint spread out."""
+    base = Config.WEBHOOK_BACKOFF_BASE if base is None else base
+    cap = Config.WEBHOOK_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** retries))
+
+
+class _Endpoint:
+    def __init__(self, max_in_flight):
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+
+class WebhookDelivery:
+    """Deliveries to customer webhook endpoints, isolated per endpoint.
+
+    Each endpoint (scheme and host) gets at most max_in_flight concurrent
+    requests from this worker. After failure_threshold consecutive failures
+    its circuit opens and requests are refused for cooldown seconds, then a
+    single trial request decides whether it closes again. Refused requests
+    raise a DeliveryDeferred instead of waiting, so the task can be retried
+    later and one slow or dead endpoint does not hold the worker's slots.
+    """
+
+    def __init__(self, max_in_flight=4, failure_threshold=5, cooldown=60):
+        self.max_in_flight = max_in_flight
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+    def _endpoint(self, url):
+        key = self.endpoint_key(url)
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = _Endpoint(self.max_in_flight)
+                self._endpoints[key] = endpoint
+        return endpoint
+
+    def post(self, url, data, headers=None):
+        """POST data to url, raising DeliveryDeferred, PermanentDeliveryError or requests' errors."""
+        endpoint = self._endpoint(url)
+        is_trial = self._admit(url, endpoint)
+
+        if not endpoint.slots.acquire(blocking=False):
+            if is_trial:
+                with endpoint.lock:
+                    endpoint.trial_in_flight = False
+            raise EndpointBusy(f"{self.endpoint_key(url)} has {self.max_in_flight} requests in flight",
+                               backoff_delay(0))
+        try:
+            response = httpClient.post(
+                url,
+                data=data,
+                headers=headers,
+                timeout=(Config.WEBHOOK_CONNECT_TIMEOUT, Config.WEBHOOK_READ_TIMEOUT),
+            )
+            if response.status_code >= 500 or response.status_code in (408, 429):
+                response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self._record(endpoint, failed=True)
+            raise
+        finally:
+            endpoint.slots.release()
+
+        # The endpoint is up even when it rejects this payload
+        self._record(endpoint, failed=False)
+        if response.status_code >= 400:
+            raise PermanentDeliveryError(f"{url} rejected the webhook with status {response.status_code}")
+        return response
+
+    def _admit(self, url, endpoint):
+        """Refuse requests while the circuit is open; returns True for the half-open trial request."""
+        with endpoint.lock:
+            if endpoint.opened_at is None:
+                return False
+            remaining = endpoint.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or endpoint.trial_in_flight:
+                raise CircuitOpen(f"Circuit open for {self.endpoint_key(url)}",
+                                  max(remaining, 0) + backoff_delay(0))
+            endpoint.trial_in_flight = True
+            return True
+
+    def _record(self, endpoint, failed):
+        with endpoint.lock:
+            endpoint.trial_in_flight = False
+            if not failed:
+                endpoint.failures = 0
+                endpoint.opened_at = None
+                return
+            endpoint.failures += 1
+            # A failed trial re-opens the circuit for another cooldown
+            if endpoint.opened_at is not None or endpoint.failures >= self.failure_threshold:
+                endpoint.opened_at = time.monotonic()
+
+    def get_state(self):
+        """Per-endpoint consecutive failures and whether the circuit is open."""
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {
+            key: {"failures": endpoint.failures, "open": endpoint.opened_at is not None}
+            for key, endpoint in endpoints.items()
+        }
+
+
+webhook_delivery = WebhookDelivery(
+    Config.WEBHOOK_MAX_IN_FLIGHT,
+    Config.WEBHOOK_CIRCUIT_FAILURES,
+    Config.WEBHOOK_CIRCUIT_COOLDOWN,
+)
@@ -8,50 +8,54 @@ import traceback
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.crewai.transcript_analyze_agent import analyze_transcript
-from src.crewai.pre_verify_agent import preverify_lead
+from src.crewai.pre_verify_agent import preverify_lead, preverify_leads_batch
 from src.crewai.crews.agent_webscraper.agent_webscraper import WebScraper
+from src.crewai.crew_pool import warm_all
+from src.crewai import tracing
 
 app = Flask(__name__)
 web_scraper = WebScraper()
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    data = request.json
-    
+# Build the pooled crews before the first request instead of during it
+if os.environ.get('CREW_POOL_WARM', 'true').lower() == 'true':
+    warm_all()
+
+# The *_response functions hold the endpoint logic and return (body, status code),
+# so the Flask app below and the asyncio server in async_api_server.py share it.
+
+def analyze_response(data):
     if not data or 'customerPrompt' not in data or 'transcript' not in data:
-        return jsonify({
+        return {
             'error': 'Missing required fields: customerPrompt and transcript'
-        }), 400
-    
+        }, 400
+
     customer_prompt = data['customerPrompt']
     transcript = data['transcript']
-    
+
     try:
-        # Call transcript analysis function
-        result = analyze_transcript(customer_prompt, transcript)
-        
+        # Call transcript analysis function; the node's criteria are extracted once for all its leads
+        result = analyze_transcript(
+            customer_prompt, transcript, data.get('flowId'), data.get('nodeId'), data.get('mode'))
+
         # Check if result is JSON with error
         if isinstance(result, dict) and 'error' in result:
-            return jsonify(result), 500
-        
+            return result, 500
+
         # Return successful result
-        return jsonify(result)
+        return result, 200
     except Exception as e:
         # Log detailed error for debugging
         error_traceback = traceback.format_exc()
         print(f"Error analyzing transcript: {str(e)}\n{error_traceback}")
-        
-        return jsonify({
+
+        return {
             'error': 'Failed to analyze transcript',
             'message': str(e)
-        }), 500
-
-@app.route('/preverify', methods=['POST'])
-def preverify():
-    data = request.json
+        }, 500
 
+def preverify_response(data):
     if not data or 'leadData' not in data:
-        return jsonify({'error': 'Missing required field: leadData'}), 400
+        return {'error': 'Missing required field: leadData'}, 400
 
     # Always expect stringified JSON for both fields
     lead_data_str = data['leadData']
@@ -67,54 +71,102 @@ def preverify():
 
         # Check if result is JSON with error
         if isinstance(result, dict) and 'error' in result:
-            return jsonify(result), 500
+            return result, 500
 
-        return jsonify(result)
+        return result, 200
     except json.JSONDecodeError as e:
-        return jsonify({
+        return {
             'error': 'Invalid JSON in leadData or criteriaField',
             'message': str(e)
-        }), 400
+        }, 400
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"Error preverifying lead: {str(e)}\n{error_traceback}")
-        return jsonify({
+        return {
             'error': 'Failed to preverify lead',
             'message': str(e)
-        }), 500
+        }, 500
 
-@app.route('/scrape', methods=['POST'])
-def scrape():
-    data = request.json
-    
+def preverify_batch_response(data):
+    if not data or not isinstance(data.get('leads'), list):
+        return {'error': 'Missing required field: leads'}, 400
+
+    # Same convention as /preverify: leadData and criteriaField are stringified JSON
+    criteria_field_str = data.get('criteriaField', None)
+
+    try:
+        leads = [
+            {'leadId': str(lead['leadId']), 'leadData': json.loads(lead['leadData'])}
+            for lead in data['leads']
+        ]
+        criteria_field = json.loads(criteria_field_str) if criteria_field_str else None
+
+        results = preverify_leads_batch(leads, criteria_field, data.get('chunkSize'))
+
+        return {'results': results}, 200
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        return {
+            'error': 'Invalid leads or criteriaField',
+            'message': str(e)
+        }, 400
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        print(f"Error preverifying lead batch: {str(e)}\n{error_traceback}")
+        return {
+            'error': 'Failed to preverify lead batch',
+            'message': str(e)
+        }, 500
+
+def scrape_response(data):
     if not data or 'url' not in data or 'promptCriteria' not in data:
-        return jsonify({
+        return {
             'error': 'Missing required fields: url and promptCriteria'
-        }), 400
-    
+        }, 400
+
     url = data['url']
     prompt_criteria = data['promptCriteria']
-    
+
     try:
         # Call the scraping and analysis function
         result = web_scraper.scrape_and_analyze(url, prompt_criteria)
-        
+
         # Check if result contains error
         if isinstance(result, dict) and 'error' in result:
-            return jsonify(result), 500
-        
+            return result, 500
+
         # Return successful result
-        return jsonify(result)
+        return result, 200
     except Exception as e:
         # Log detailed error for debugging
         error_traceback = traceback.format_exc()
         print(f"Error scraping and analyzing: {str(e)}\n{error_traceback}")
-        
-        return jsonify({
+
+        return {
             'error': 'Failed to scrape and analyze website',
             'message': str(e)
-        }), 500
+        }, 500
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    body, status = tracing.traced('analyze', analyze_response, request.json, request.headers.get('traceparent'))
+    return jsonify(body), status
+
+@app.route('/preverify', methods=['POST'])
+def preverify():
+    body, status = tracing.traced('preverify', preverify_response, request.json, request.headers.get('traceparent'))
+    return jsonify(body), status
+
+@app.route('/preverify/batch', methods=['POST'])
+def preverify_batch():
+    body, status = tracing.traced(
+        'preverify/batch', preverify_batch_response, request.json, request.headers.get('traceparent'))
+    return jsonify(body), status
+
+@app.route('/scrape', methods=['POST'])
+def scrape():
+    body, status = tracing.traced('scrape', scrape_response, request.json, request.headers.get('traceparent'))
+    return jsonify(body), status
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
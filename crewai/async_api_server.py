@@ -0,0 +1,124 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from api_server import (
+    analyze_response,
+    preverify_batch_response,
+    preverify_response,
+    scrape_response,
+)
+from src.crewai import tracing
+
+
+class Saturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Endpoint saturated")
+        self.retry_after = retry_after
+
+
+class EndpointLimiter:
+    """Caps how many crews one endpoint runs at once and how many requests may wait.
+
+    Requests beyond concurrency wait in line up to queue_limit; past that the
+    endpoint is saturated and the caller gets a Retry-After estimate based on
+    the average crew run time.
+    """
+
+    def __init__(self, name, concurrency, queue_limit):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.waiting = 0
+        self.avg_duration = 1.0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def retry_after(self):
+        rounds = (self.waiting // self.concurrency) + 1
+        return max(1, math.ceil(self.avg_duration * rounds))
+
+    async def run(self, executor, fn, *args):
+        if self._semaphore.locked() and self.waiting >= self.queue_limit:
+            raise Saturated(self.retry_after())
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self._semaphore.release()
+            # Exponential moving average of crew run time for Retry-After
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * (time.monotonic() - started)
+
+
+def _limit(name, default_concurrency, default_queue_limit):
+    key = name.upper()
+    return EndpointLimiter(
+        name,
+        int(os.environ.get(f'{key}_CONCURRENCY', default_concurrency)),
+        int(os.environ.get(f'{key}_QUEUE_LIMIT', default_queue_limit)),
+    )
+
+
+def _endpoint(path, limiter, handler):
+    async def view(request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        try:
+            body, status = await limiter.run(
+                request.app['executor'], tracing.traced, path, handler, data, request.headers.get('traceparent'))
+        except Saturated as e:
+            return web.json_response(
+                {'error': f'Too many {limiter.name} requests in progress, retry later'},
+                status=429,
+                headers={'Retry-After': str(e.retry_after)},
+            )
+        return web.json_response(body, status=status)
+
+    return view
+
+
+async def _shutdown_executor(app):
+    app['executor'].shutdown(wait=False)
+
+
+def create_app():
+    limiters = {
+        'analyze': _limit('analyze', 4, 16),
+        'preverify': _limit('preverify', 8, 32),
+        'preverify_batch': _limit('preverify_batch', 2, 8),
+        'scrape': _limit('scrape', 4, 16),
+    }
+
+    app = web.Application()
+    # One worker thread per crew that may run at once
+    app['executor'] = ThreadPoolExecutor(
+        max_workers=sum(limiter.concurrency for limiter in limiters.values()),
+        thread_name_prefix='crew',
+    )
+    app['limiters'] = limiters
+    app.on_cleanup.append(_shutdown_executor)
+
+    app.router.add_post('/analyze', _endpoint('analyze', limiters['analyze'], analyze_response))
+    app.router.add_post('/preverify', _endpoint('preverify', limiters['preverify'], preverify_response))
+    app.router.add_post('/preverify/batch',
+                        _endpoint('preverify/batch', limiters['preverify_batch'], preverify_batch_response))
+    app.router.add_post('/scrape', _endpoint('scrape', limiters['scrape'], scrape_response))
+    return app
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    web.run_app(create_app(), host='0.0.0.0', port=port)
@@ -0,0 +1,92 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Crews kept per crew type; match it to the endpoint concurrency of the API server
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", 4))
+
+_pools = []
+
+
+class CrewPool:
+    """Reusable, pre-built crews of one type.
+
+    Building a crew parses the YAML agent/task configs and creates the agents
+    and their LLM clients, so crews are built once and handed out one request
+    at a time. A crew's per-run state is cleared when it is returned.
+    """
+
+    def __init__(self, name, factory, size=CREW_POOL_SIZE):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        _pools.append(self)
+
+    def warm(self):
+        """Build crews up front until the pool is full."""
+        while self._try_create():
+            pass
+
+    @contextmanager
+    def crew(self):
+        crew = self._checkout()
+        try:
+            yield crew
+        finally:
+            self._checkin(crew)
+
+    def _try_create(self):
+        with self._lock:
+            if self._created >= self.size:
+                return False
+            self._created += 1
+        try:
+            self._idle.put(self.factory())
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        return True
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        if self._try_create():
+            return self._idle.get()
+        # Pool is at full size, wait for a crew to come back
+        return self._idle.get()
+
+    def _checkin(self, crew):
+        try:
+            reset_crew(crew)
+        except Exception as e:
+            # Never hand out a crew in an unknown state, build a new one next time
+            print(f"Dropping {self.name} crew that failed to reset: {str(e)}")
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(crew)
+
+
+def reset_crew(crew):
+    """Clear what a kickoff leaves behind on the crew's tasks and agents."""
+    for task in crew.tasks:
+        task.output = None
+    for agent in crew.agents:
+        if hasattr(agent, "tools_results"):
+            agent.tools_results = []
+
+
+def warm_all():
+    for pool in _pools:
+        pool.warm()
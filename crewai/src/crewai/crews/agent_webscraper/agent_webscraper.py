@@ -1,14 +1,15 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import FileWriterTool
 import json
 from crewai_tools import ScrapeWebsiteTool
 
-file_writer_tool = FileWriterTool(
-    filename="scraping_result.txt",
-    directory="agent_webscraper",
-)
+from src.crewai.results import Verdict, crew_output_json
+from src.crewai.crew_pool import CrewPool
+from src.crewai import tracing
+from src.crewai.verdict_cache import cached_verdict, normalize_url, template_version
+import os
 
+SCRAPE_TEMPLATE = template_version(os.path.join(os.path.dirname(__file__), "config"))
 
 
 @CrewBase
@@ -36,7 +37,6 @@ class WebScraperCrew:
     def criteria_analyzer_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["criteria_analyzer_agent"],
-            tools=[file_writer_tool],
         )
 
     @task
@@ -49,6 +49,7 @@ class WebScraperCrew:
     def analyze_content(self) -> Task:
         return Task(
             config=self.tasks_config["analyze_content"],
+            output_pydantic=Verdict,
         )
 
     @crew
@@ -62,19 +63,23 @@ class WebScraperCrew:
 
 class WebScraper:
     def __init__(self):
-        self.scraper_crew = WebScraperCrew()
+        self.scraper_crews = CrewPool("scrape", lambda: WebScraperCrew().crew())
 
+    @cached_verdict("scrape", SCRAPE_TEMPLATE, normalizers={"url": normalize_url})
     def scrape_and_analyze(self, url: str, prompt_criteria: str):
         try:
-            result = self.scraper_crew.crew().kickoff(
-                inputs={
-                    "website_url": url,
-                    "prompt_criteria": prompt_criteria
-                }
-            )
+            with self.scraper_crews.crew() as crew:
+                result = tracing.kickoff(
+                    crew,
+                    "scrape",
+                    {
+                        "website_url": url,
+                        "prompt_criteria": prompt_criteria
+                    }
+                )
 
             try:
-                    result_json = json.loads(result)
+                    result_json = crew_output_json(result)
                     return result_json
             except (json.JSONDecodeError) as e:
                 return {
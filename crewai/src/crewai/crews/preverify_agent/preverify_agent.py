@@ -1,13 +1,7 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai_tools import FileWriterTool
-
-
-file_writer_tool_preverify_lead = FileWriterTool(
-    filename="result.txt",
-    directory="preverify_agent",
-)
 
+from src.crewai.results import BatchVerdict, Verdict
 
 
 @CrewBase
@@ -19,13 +13,13 @@ class PreverifyAgent:
     def preverify_lead_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["preverify_lead_agent"],  # type: ignore[index]
-            tools=[file_writer_tool_preverify_lead],
         )
 
     @task
     def preverify_lead(self) -> Task:
         return Task(
             config=self.tasks_config["preverify_lead"],  # type: ignore[index]
+            output_pydantic=Verdict,
         )
 
     @crew
@@ -38,3 +32,30 @@ class PreverifyAgent:
         )
 
 
+@CrewBase
+class PreverifyBatchAgent:
+    """Evaluates a chunk of leads against the same criteria in a single task."""
+
+    agents_config = "config/agents.yaml"
+    tasks_config = "config/tasks.yaml"
+    @agent
+    def preverify_lead_agent(self) -> Agent:
+        return Agent(
+            config=self.agents_config["preverify_lead_agent"],  # type: ignore[index]
+        )
+
+    @task
+    def preverify_lead_batch(self) -> Task:
+        return Task(
+            config=self.tasks_config["preverify_lead_batch"],  # type: ignore[index]
+            output_pydantic=BatchVerdict,
+        )
+
+    @crew
+    def crew(self) -> Crew:
+        return Crew(
+            agents=self.agents,
+            tasks=self.tasks,
+            process=Process.sequential,
+            verbose=True,
+        )
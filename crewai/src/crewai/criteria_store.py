@@ -0,0 +1,76 @@
+import hashlib
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from src.crewai.verdict_cache import VerdictCache, normalize_text
+
+load_dotenv()
+
+CRITERIA_STORE_PATH = os.getenv("CRITERIA_STORE_PATH", "criteria_store.sqlite3")
+CRITERIA_STORE_TTL = int(os.getenv("CRITERIA_STORE_TTL", 30 * 24 * 3600))  # seconds
+CRITERIA_STORE_MAX_ENTRIES = int(os.getenv("CRITERIA_STORE_MAX_ENTRIES", 10000))
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(normalize_text(prompt or "").encode()).hexdigest()
+
+
+class CriteriaStore:
+    """Criteria extracted from a flow node's customer prompt, kept per (node, prompt hash).
+
+    Every lead of a node is judged against the same prompt, so its criteria
+    are extracted once and reused; editing the prompt changes the hash and
+    the next call extracts them again. The key also covers the model and the
+    crew's prompt template, like the verdict cache. Concurrent first calls
+    for a node wait for one extraction instead of each running their own.
+    """
+
+    def __init__(self, path=CRITERIA_STORE_PATH, ttl=CRITERIA_STORE_TTL, max_entries=CRITERIA_STORE_MAX_ENTRIES):
+        self._cache = VerdictCache(path, ttl, max_entries)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    @staticmethod
+    def key(template, node, prompt):
+        return VerdictCache.key("criteria", template, {"node": node, "prompt": prompt_hash(prompt)})
+
+    def get_or_extract(self, template, node, prompt, extract):
+        """Stored criteria for the node's prompt, or extract() them and store a non-empty result."""
+        key = self.key(template, node, prompt)
+        criteria = self._cache.get(key)
+        if criteria is not None:
+            return criteria
+
+        with self._key_lock(key):
+            # Extracted by another request while this one waited
+            criteria = self._cache.get(key)
+            if criteria is not None:
+                return criteria
+            try:
+                criteria = extract()
+                if criteria:
+                    self._cache.put(key, "criteria", criteria)
+            finally:
+                # Requests already waiting hold the lock object; later ones find the criteria stored
+                with self._locks_lock:
+                    self._locks.pop(key, None)
+            return criteria
+
+    def _key_lock(self, key):
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_criteria_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CriteriaStore()
+    return _store
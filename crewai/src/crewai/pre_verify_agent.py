@@ -5,20 +5,37 @@ from pydantic import BaseModel
 
 from crewai.flow import Flow, listen, start
 
-from src.crewai.crews.preverify_agent.preverify_agent import PreverifyAgent
+from src.crewai.crews.preverify_agent.preverify_agent import PreverifyAgent, PreverifyBatchAgent
+from src.crewai.results import crew_output_json
+from src.crewai.crew_pool import CrewPool
+from src.crewai import tracing
+from src.crewai.verdict_cache import VERDICT_CACHE_ENABLED, cached_verdict, get_verdict_cache, normalize_json, template_version
 
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import json
 import os
 
 load_dotenv()
 
+# Leads evaluated per LLM call, and chunks evaluated at once, by preverify_leads_batch
+PREVERIFY_BATCH_CHUNK_SIZE = int(os.getenv("PREVERIFY_BATCH_CHUNK_SIZE", 10))
+PREVERIFY_BATCH_MAX_PARALLEL = int(os.getenv("PREVERIFY_BATCH_MAX_PARALLEL", 4))
+
+PREVERIFY_TEMPLATE = template_version(
+    os.path.join(os.path.dirname(__file__), "crews", "preverify_agent", "config")
+)
+
+preverify_crews = CrewPool("preverify", lambda: PreverifyAgent().crew())
+preverify_batch_crews = CrewPool("preverify_batch", lambda: PreverifyBatchAgent().crew())
+
 
 class PreverifyState(BaseModel):
     lead_raw_data: str = ""
     criteria_field: str = ""
     lead_raw_data_result: str = ""
-    preverify_lead_result: str = ""
+    preverify_lead_result: dict = {}
+    preverify_lead_raw: str = ""
 
 class PreverifyFlow(Flow[PreverifyState]):
 
@@ -29,11 +46,19 @@ class PreverifyFlow(Flow[PreverifyState]):
     @listen(read_lead_data)
     def process_lead_data(self):
         print("Processing lead data")
-        result = (
-            PreverifyAgent()
-            .crew()
-            .kickoff(inputs={"lead_raw_data": self.state.lead_raw_data, "criteria_field": self.state.criteria_field})
-        )
+        with preverify_crews.crew() as crew:
+            result = tracing.kickoff(
+                crew,
+                "preverify",
+                {"lead_raw_data": self.state.lead_raw_data, "criteria_field": self.state.criteria_field}
+            )
+
+        # Kept on this flow's own state so concurrent requests never share a result
+        self.state.preverify_lead_raw = result.raw
+        try:
+            self.state.preverify_lead_result = crew_output_json(result)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing preverify result: {str(e)}")
 
 
 
@@ -47,6 +72,15 @@ def plot():
     preverify_flow.plot()
 
 
+def _verdict_inputs(lead_data, criteria_field):
+    return {"lead_data": normalize_json(lead_data), "criteria_field": normalize_json(criteria_field)}
+
+
+@cached_verdict(
+    "preverify",
+    PREVERIFY_TEMPLATE,
+    normalizers={"lead_data": normalize_json, "criteria_field": normalize_json},
+)
 def preverify_lead(lead_data, criteria_field=None):
     preverify_flow = PreverifyFlow()
     preverify_flow.state.lead_raw_data = lead_data
@@ -57,20 +91,86 @@ def preverify_lead(lead_data, criteria_field=None):
         preverify_flow.state.criteria_field = criteria_field
         
     preverify_flow.kickoff()
-    
-    result_file_path = "result.txt"
-    
+
+    if preverify_flow.state.preverify_lead_result:
+        return preverify_flow.state.preverify_lead_result
+
+    return {
+        "error": "Could not parse result as JSON",
+        "raw_result": preverify_flow.state.preverify_lead_raw
+    }
+
+
+def _preverify_chunk(chunk, criteria_field):
+    with preverify_batch_crews.crew() as crew:
+        result = tracing.kickoff(
+            crew,
+            "preverify_batch",
+            {"leads_raw_data": json.dumps(chunk), "criteria_field": criteria_field}
+        )
+
     try:
-        with open(result_file_path, "r") as f:
-            result_content = f.read().strip()
-            result_json = json.loads(result_content)
-            return result_json
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error parsing result file: {str(e)}")
-        return {
-            "error": "Could not parse result as JSON",
-            "raw_result": preverify_flow.state.preverify_lead_result
-        }
+        parsed = crew_output_json(result)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing batch result: {str(e)}")
+        return {}
+
+    return {
+        str(item.get("leadId")): item
+        for item in parsed.get("results", [])
+        if isinstance(item, dict)
+    }
+
+
+def preverify_leads_batch(leads, criteria_field=None, chunk_size=None):
+    """Pre-verify many leads against one criteria field, several leads per LLM call.
+
+    leads is a list of {"leadId", "leadData"} dicts. Returns {leadId: result} where
+    each result has the same shape preverify_lead returns. Leads the model left out
+    of its answer are verified again on their own.
+    """
+    chunk_size = chunk_size or PREVERIFY_BATCH_CHUNK_SIZE
+    if isinstance(criteria_field, list):
+        criteria_field = json.dumps(criteria_field)
+    criteria_field = criteria_field or ""
+
+    # Leads already judged against these criteria (alone or in a batch) skip the LLM
+    results = {}
+    cache_keys = {}
+    if VERDICT_CACHE_ENABLED:
+        cache = get_verdict_cache()
+        for lead in leads:
+            key = cache.key("preverify", PREVERIFY_TEMPLATE, _verdict_inputs(lead["leadData"], criteria_field))
+            cached = cache.get(key)
+            if cached is not None:
+                results[str(lead["leadId"])] = cached
+            else:
+                cache_keys[str(lead["leadId"])] = key
+        leads = [lead for lead in leads if str(lead["leadId"]) not in results]
+
+    chunks = [leads[i:i + chunk_size] for i in range(0, len(leads), chunk_size)]
+    chunk_results = {}
+    if chunks:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), PREVERIFY_BATCH_MAX_PARALLEL)) as executor:
+            preverify_chunk = tracing.bind(lambda chunk: _preverify_chunk(chunk, criteria_field))
+            for chunk_map in executor.map(preverify_chunk, chunks):
+                chunk_results.update(chunk_map)
+
+    for lead in leads:
+        lead_id = str(lead["leadId"])
+        result = chunk_results.get(lead_id)
+        if result is None:
+            print(f"Lead {lead_id} missing from batch result, verifying it alone")
+            results[lead_id] = preverify_lead(lead["leadData"], criteria_field)
+        else:
+            results[lead_id] = {
+                "pass": bool(result.get("pass", False)),
+                "criteria_results": result.get("criteria_results", []),
+            }
+            if lead_id in cache_keys:
+                get_verdict_cache().put(cache_keys[lead_id], "preverify", results[lead_id])
+
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class CriterionResult(BaseModel):
+    criterion: str
+    passed: bool
+    reason: str = ""
+    must_have: Optional[bool] = None
+
+
+class Verdict(BaseModel):
+    """Pass/fail answer shared by the pre-verify, transcript and web scraping crews."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    pass_: bool = Field(alias="pass")
+    criteria_results: List[CriterionResult] = []
+    message: Optional[str] = None
+
+
+class LeadVerdict(Verdict):
+    leadId: str
+
+
+class BatchVerdict(BaseModel):
+    results: List[LeadVerdict] = []
+
+
+class Criterion(BaseModel):
+    name: str
+    description: str = ""
+    must_have: bool = False
+
+
+class CriteriaList(BaseModel):
+    criteria: List[Criterion] = []
+
+
+class CriterionEvidence(BaseModel):
+    criterion: str
+    found: bool = False
+    supports: Optional[bool] = None
+    quote: str = ""
+
+
+class ChunkEvidence(BaseModel):
+    """What one part of a long transcript says about each criterion."""
+
+    evidence: List[CriterionEvidence] = []
+
+
+def parse_json_output(raw):
+    """Parse an agent's raw answer, tolerating a ```json fenced block."""
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[len("json"):]
+    return json.loads(text)
+
+
+def crew_output_json(result):
+    """Return a crew's final answer as plain JSON data, read from memory instead of a result file.
+
+    Uses the structured output of the last task when it has one, otherwise
+    parses the raw text. Raises json.JSONDecodeError if neither is JSON.
+    """
+    if getattr(result, "pydantic", None) is not None:
+        return result.pydantic.model_dump(by_alias=True, exclude_none=True)
+    if getattr(result, "json_dict", None):
+        return result.json_dict
+    return parse_json_output(result.raw)
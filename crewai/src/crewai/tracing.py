@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Spans are appended here as JSON lines, in the format the server and workers write; empty turns it off
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+SERVICE_NAME = "crewai"
+
+# W3C trace context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# (trace id, span id) of the current span; a ContextVar so it follows crewai flows into their event loop
+_current = ContextVar("trace_span", default=None)
+_export_lock = threading.Lock()
+_export_file = None
+
+
+def _export(record):
+    global _export_file
+    if not TRACE_FILE:
+        return
+    line = json.dumps(record, default=str)
+    with _export_lock:
+        if _export_file is None:
+            _export_file = open(TRACE_FILE, "a", encoding="utf-8")
+        _export_file.write(line + "\n")
+        _export_file.flush()
+
+
+def _record(name, trace_id, span_id, parent_id, start, duration, attributes):
+    _export({
+        "traceId": trace_id,
+        "spanId": span_id,
+        "parentId": parent_id,
+        "name": name,
+        "service": SERVICE_NAME,
+        "start": start,
+        "durationMs": round(duration * 1000, 3),
+        "attributes": attributes,
+    })
+
+
+@contextmanager
+def span(name, traceparent=None, **attributes):
+    """Time a block as a span, nested under the current span or the caller's traceparent."""
+    parent = _current.get()
+    match = _TRACEPARENT.match(traceparent.strip().lower()) if isinstance(traceparent, str) else None
+    if match:
+        trace_id, parent_id = match.groups()
+    elif parent is not None:
+        trace_id, parent_id = parent
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    span_id = secrets.token_hex(8)
+    token = _current.set((trace_id, span_id))
+    start, started = time.time(), time.perf_counter()
+    try:
+        yield attributes
+    except Exception as e:
+        attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        _record(name, trace_id, span_id, parent_id, start, time.perf_counter() - started, attributes)
+
+
+def traced(endpoint, handler, data, traceparent=None):
+    """Run an endpoint's *_response handler in a span continuing the caller's trace."""
+    with span(f"POST /{endpoint}", traceparent) as attributes:
+        body, status = handler(data)
+        attributes["status"] = status
+        return body, status
+
+
+def bind(fn):
+    """Wrap fn so spans opened from an executor thread nest under the submitting request's span."""
+    parent = _current.get()
+
+    def wrapper(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return wrapper
+
+
+def kickoff(crew, name, inputs):
+    """crew.kickoff(inputs) in a span, with a child span per agent task.
+
+    Tasks run one after another, so each task's span runs from the end of the
+    previous one (or the kickoff) to its completion callback.
+    """
+    with span(f"crew {name}"):
+        trace_id, crew_span_id = _current.get()
+        boundary = [time.time(), time.perf_counter()]
+
+        def on_task_done(output, previous=None):
+            now, now_perf = time.time(), time.perf_counter()
+            _record(
+                f"task {getattr(output, 'name', None) or 'unnamed'}",
+                trace_id, secrets.token_hex(8), crew_span_id,
+                boundary[0], now_perf - boundary[1],
+                {"agent": str(getattr(output, "agent", ""))},
+            )
+            boundary[:] = [now, now_perf]
+            if previous is not None:
+                previous(output)
+
+        callbacks = [task.callback for task in crew.tasks]
+        for task, previous in zip(crew.tasks, callbacks):
+            task.callback = lambda output, previous=previous: on_task_done(output, previous)
+        try:
+            return crew.kickoff(inputs=inputs)
+        finally:
+            # Pooled crews are reused, leave them as they were
+            for task, previous in zip(crew.tasks, callbacks):
+                task.callback = previous
@@ -5,19 +5,101 @@ from pydantic import BaseModel
 
 from crewai.flow import Flow, listen, start
 
-from src.crewai.crews.transcript_analytics_crew.transcript_analytics_crew import TranscriptAnalyzeCrew
-
+from src.crewai.crews.transcript_analytics_crew.transcript_analytics_crew import (
+    CriteriaExtractionCrew,
+    EvidenceExtractionCrew,
+    TranscriptAnalyzeCrew,
+)
+from src.crewai.results import crew_output_json
+from src.crewai.crew_pool import CrewPool
+from src.crewai.criteria_store import get_criteria_store
+from src.crewai import tracing
+from src.crewai.transcript_chunks import chunk_transcript, reduce_evidence
+from src.crewai.verdict_cache import cached_verdict, template_version
+
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import json
 import os
 
 load_dotenv()
 
+# Transcripts longer than this many characters are evaluated chunk by chunk (map-reduce),
+# in chunks of whole speaker turns up to TRANSCRIPT_CHUNK_CHARS, at most TRANSCRIPT_CHUNK_MAX_PARALLEL at once
+TRANSCRIPT_CHUNKED_MIN_CHARS = int(os.getenv("TRANSCRIPT_CHUNKED_MIN_CHARS", 12000))
+TRANSCRIPT_CHUNK_CHARS = int(os.getenv("TRANSCRIPT_CHUNK_CHARS", 4000))
+TRANSCRIPT_CHUNK_MAX_PARALLEL = int(os.getenv("TRANSCRIPT_CHUNK_MAX_PARALLEL", 4))
+
+TRANSCRIPT_TEMPLATE = template_version(
+    os.path.join(os.path.dirname(__file__), "crews", "transcript_analytics_crew", "config")
+)
+
+criteria_crews = CrewPool("criteria", lambda: CriteriaExtractionCrew().crew())
+transcript_crews = CrewPool("transcript", lambda: TranscriptAnalyzeCrew().crew())
+evidence_crews = CrewPool("evidence", lambda: EvidenceExtractionCrew().crew())
+
+
+def extract_criteria(customer_prompt):
+    """Run the criteria extraction crew on a customer prompt; returns the criteria list, [] if unparsable."""
+    with criteria_crews.crew() as crew:
+        result = tracing.kickoff(crew, "criteria", {"customer_prompt": customer_prompt})
+
+    print("Customer prompt analyzed", result.raw)
+    try:
+        criteria = crew_output_json(result)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing criteria result: {str(e)}")
+        return []
+    return criteria.get("criteria", []) if isinstance(criteria, dict) else criteria
+
+
+def _chunk_evidence(criteria_json, chunk, position):
+    with evidence_crews.crew() as crew:
+        result = tracing.kickoff(
+            crew,
+            "evidence",
+            {"criteria": criteria_json, "chunk": chunk, "chunk_position": position}
+        )
+
+    try:
+        parsed = crew_output_json(result)
+    except json.JSONDecodeError as e:
+        print(f"Error parsing evidence of transcript part {position}: {str(e)}")
+        return None
+    return parsed.get("evidence", []) if isinstance(parsed, dict) else []
+
+
+def evaluate_chunked(criteria, transcript, chunk_chars=TRANSCRIPT_CHUNK_CHARS):
+    """Map-reduce evaluation of a long transcript.
+
+    Evidence for every criterion is pulled from each chunk of speaker turns
+    in parallel, then reduced in code into the evaluate_transcript result
+    shape, so the latency follows the longest chunk instead of the whole call.
+    """
+    chunks = chunk_transcript(transcript, chunk_chars)
+    print(f"Evaluating transcript in {len(chunks)} parts")
+    criteria_json = json.dumps(criteria)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), TRANSCRIPT_CHUNK_MAX_PARALLEL))) as executor:
+        chunk_evidence = tracing.bind(
+            lambda args: _chunk_evidence(criteria_json, args[1], f"{args[0] + 1} of {len(chunks)}"))
+        evidence = list(executor.map(chunk_evidence, enumerate(chunks)))
+
+    parsed = [chunk for chunk in evidence if chunk is not None]
+    if not parsed:
+        # Nothing to judge on; analyze_transcript reports the parse error
+        return {}
+    return reduce_evidence(criteria, parsed)
+
 
 class TranscriptState(BaseModel):
     customer_prompt: str = ""
     customer_prompt_result: str = ""
+    flow_id: str = ""
+    node_id: str = ""
+    criteria: list = []
+    mode: str = ""
     transcript: str = ""
+    transcript_result: dict = {}
 
 class TranscriptFlow(Flow[TranscriptState]):
 
@@ -31,20 +113,47 @@ class TranscriptFlow(Flow[TranscriptState]):
     @listen(customer_prompt)
     def prompt_analyze(self):
         print("Analyze Prompt")
-        result = (
-            TranscriptAnalyzeCrew()
-            .crew()
-            .kickoff(inputs={"customer_prompt": self.state.customer_prompt, "transcripts": self.state.transcript})
+        # Same prompt for every lead of a flow node, so its criteria come from the store after the first call
+        node = f"{self.state.flow_id}:{self.state.node_id}" if self.state.node_id else None
+        self.state.criteria = get_criteria_store().get_or_extract(
+            TRANSCRIPT_TEMPLATE,
+            node,
+            self.state.customer_prompt,
+            lambda: extract_criteria(self.state.customer_prompt),
         )
-
-        print("Customer prompt analyzed", result.raw)
-        self.state.customer_prompt_result = result.raw
+        print(f"Using criteria: {self.state.criteria}")
 
     @listen(prompt_analyze)
     def evaluate_transcript(self):
-        print("Evaluated transcript")
-        with open("result.txt", "w") as f:
-            f.write(self.state.customer_prompt_result)
+        print("Evaluate transcript")
+        if not self.state.criteria:
+            # Nothing to judge against; analyze_transcript reports it instead of a verdict
+            return
+        if self.use_chunks():
+            self.state.transcript_result = evaluate_chunked(self.state.criteria, self.state.transcript)
+            return
+
+        with transcript_crews.crew() as crew:
+            result = tracing.kickoff(
+                crew,
+                "transcript",
+                {"criteria": json.dumps(self.state.criteria), "transcripts": self.state.transcript}
+            )
+
+        print("Transcript evaluated", result.raw)
+        self.state.customer_prompt_result = result.raw
+
+        # Kept on this flow's own state so concurrent requests never share a result
+        try:
+            self.state.transcript_result = crew_output_json(result)
+        except json.JSONDecodeError as e:
+            print(f"Error parsing transcript result: {str(e)}")
+
+    def use_chunks(self):
+        """Whether to run the chunked evaluation: always in "chunked" mode, never in "single", else for long calls."""
+        if self.state.mode in ("chunked", "single"):
+            return self.state.mode == "chunked"
+        return len(self.state.transcript) > TRANSCRIPT_CHUNKED_MIN_CHARS
 
 
 def kickoff():
@@ -57,25 +166,35 @@ def plot():
     analyze_flow.plot()
 
 
-def analyze_transcript(customer_prompt, transcript):
+@cached_verdict("analyze", TRANSCRIPT_TEMPLATE)
+def analyze_transcript(customer_prompt, transcript, flow_id=None, node_id=None, mode=None):
+    """Judge a call transcript against the criteria of the flow node's prompt.
+
+    flow_id and node_id name the node the criteria are stored for; without
+    them the criteria are shared by every caller with the same prompt.
+    mode is "chunked" or "single" to force an evaluation strategy; by default
+    transcripts longer than TRANSCRIPT_CHUNKED_MIN_CHARS are chunked.
+    """
 
     analyze_flow = TranscriptFlow()
     analyze_flow.state.customer_prompt = customer_prompt
+    analyze_flow.state.flow_id = str(flow_id or "")
+    analyze_flow.state.node_id = str(node_id or "")
+    analyze_flow.state.mode = mode or ""
     analyze_flow.state.transcript = transcript
     analyze_flow.kickoff()
-    
-    result_file_path = "result.txt"
-    
-    try:
-        with open(result_file_path, "r") as f:
-            result_json = json.loads(f.read().strip())
-            return result_json
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error parsing result file: {str(e)}")
-        return {
-            "error": "Could not parse result as JSON",
-            "raw_result": analyze_flow.state.customer_prompt_result
-        }
+
+    if not analyze_flow.state.criteria:
+        # An error result, so the verdict cache doesn't keep it for the transcript
+        return {"error": "Could not extract criteria from the customer prompt"}
+
+    if analyze_flow.state.transcript_result:
+        return analyze_flow.state.transcript_result
+
+    return {
+        "error": "Could not parse result as JSON",
+        "raw_result": analyze_flow.state.customer_prompt_result
+    }
 
 
 if __name__ == "__main__":
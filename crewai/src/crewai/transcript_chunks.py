@@ -0,0 +1,111 @@
+import re
+from collections import Counter
+
+from src.crewai.results import CriterionResult, Verdict
+
+# "Bot: ...", "Customer: ...", "Agent 2: ..." at the start of a turn
+_SPEAKER = re.compile(r"(?:^|(?<=\s))([A-Z][\w'-]*(?: \d+)?):\s")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_turns(transcript):
+    """Split a transcript into speaker turns.
+
+    One turn per line when the transcript has lines; a single-line
+    transcript is split at speaker labels that occur more than once, so a
+    colon inside a sentence is not mistaken for a new speaker.
+    """
+    lines = [line.strip() for line in transcript.splitlines() if line.strip()]
+    if len(lines) > 1:
+        return lines
+
+    text = transcript.strip()
+    matches = list(_SPEAKER.finditer(text))
+    speakers = Counter(match.group(1) for match in matches)
+    starts = [match.start(1) for match in matches if speakers[match.group(1)] > 1]
+    if not starts:
+        return [text] if text else []
+    if starts[0] != 0:
+        starts.insert(0, 0)
+    return [text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)])]
+
+
+def _split_long_turn(turn, max_chars):
+    """Pieces of a turn longer than max_chars, cut at sentence ends where possible."""
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(turn):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_transcript(transcript, max_chars):
+    """Group whole speaker turns into chunks of at most max_chars, in transcript order."""
+    chunks, current, size = [], [], 0
+    for turn in split_turns(transcript):
+        for piece in ([turn] if len(turn) <= max_chars else _split_long_turn(turn, max_chars)):
+            if current and size + 1 + len(piece) > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + (1 if size else 0)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _name(value):
+    return " ".join(str(value or "").lower().split())
+
+
+def reduce_evidence(criteria, chunk_evidence):
+    """Combine the evidence found in every chunk into the Verdict shape of a single-pass evaluation.
+
+    Chunks are in transcript order and the last chunk with relevant
+    evidence decides a criterion, so a lead who corrects an earlier answer
+    is judged on the correction. The lead passes with the evaluate_transcript
+    rules: every must-have criterion met and at least half of all criteria.
+    """
+    latest = {}
+    for evidence in chunk_evidence:
+        for item in evidence:
+            if item.get("found") and item.get("supports") is not None:
+                latest[_name(item.get("criterion"))] = item
+
+    results = []
+    for criterion in criteria:
+        item = latest.get(_name(criterion.get("name")))
+        if item is None:
+            passed, reason = False, "Not mentioned in the call"
+        else:
+            passed, reason = bool(item["supports"]), item.get("quote") or ""
+        results.append(CriterionResult(
+            criterion=criterion.get("name", ""),
+            passed=passed,
+            reason=reason,
+            must_have=bool(criterion.get("must_have", False)),
+        ))
+
+    met = sum(result.passed for result in results)
+    failed_must_have = [result.criterion for result in results if result.must_have and not result.passed]
+    if failed_must_have:
+        message = f"Must-have criteria not met: {', '.join(failed_must_have)}"
+    else:
+        message = f"{met} of {len(results)} criteria met"
+    verdict = Verdict(
+        pass_=not failed_must_have and met * 2 >= len(results),
+        criteria_results=results,
+        message=message,
+    )
+    return verdict.model_dump(by_alias=True, exclude_none=True)
@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VERDICT_CACHE_ENABLED = os.getenv("VERDICT_CACHE_ENABLED", "true").lower() == "true"
+VERDICT_CACHE_PATH = os.getenv("VERDICT_CACHE_PATH", "verdict_cache.sqlite3")
+VERDICT_CACHE_TTL = int(os.getenv("VERDICT_CACHE_TTL", 7 * 24 * 3600))  # seconds
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", 50000))
+
+# Evicting is a full scan, so it only runs every this many writes
+_EVICT_EVERY = 200
+
+
+def current_model():
+    return os.getenv("MODEL") or os.getenv("OPENAI_MODEL_NAME") or ""
+
+
+def template_version(config_dir):
+    """Hash of a crew's YAML agent/task configs, so editing a prompt invalidates its verdicts."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(config_dir)):
+        if name.endswith((".yaml", ".yml")):
+            with open(os.path.join(config_dir, name), "rb") as f:
+                digest.update(name.encode())
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def normalize_text(value):
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+
+def normalize_url(value):
+    if not isinstance(value, str):
+        return value
+    parts = urlsplit(value.strip())
+    if not parts.scheme:
+        parts = urlsplit(f"https://{value.strip()}")
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def normalize_json(value):
+    """Parse stringified JSON so formatting and key order don't change the key."""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return normalize_text(value)
+    return value
+
+
+class VerdictCache:
+    """Content-addressed store of LLM verdicts in a local SQLite file, with TTL and size eviction."""
+
+    def __init__(self, path=VERDICT_CACHE_PATH, ttl=VERDICT_CACHE_TTL, max_entries=VERDICT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, endpoint TEXT, value TEXT,"
+            " created_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_accessed_at ON verdicts (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(endpoint, template, inputs):
+        canonical = json.dumps(
+            {"endpoint": endpoint, "model": current_model(), "template": template, "inputs": inputs},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM verdicts WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE verdicts SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, endpoint, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, endpoint, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(value), now, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM verdicts WHERE key IN ("
+            " SELECT key FROM verdicts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_verdict_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VerdictCache()
+    return _cache
+
+
+def cached_verdict(endpoint, template, normalizers=None):
+    """Skip the crew entirely when the same inputs were already judged.
+
+    The cache key covers the endpoint, the wrapped function's arguments (after
+    the per-argument normalizers), the model and the prompt template version.
+    Results carrying an "error" are never cached.
+    """
+    normalizers = normalizers or {}
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not VERDICT_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            inputs = {
+                name: normalizers.get(name, normalize_text)(value)
+                for name, value in bound.arguments.items()
+                if name != "self"
+            }
+
+            cache = get_verdict_cache()
+            key = cache.key(endpoint, template, inputs)
+            cached = cache.get(key)
+            if cached is not None:
+                print(f"Verdict cache hit for {endpoint}")
+                return cached
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, dict) and "error" not in result:
+                cache.put(key, endpoint, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The API imports its modules as src.crewai..., from the crewai directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
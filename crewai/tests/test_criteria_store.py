@@ -0,0 +1,38 @@
+from src.crewai.criteria_store import CriteriaStore
+
+
+def test_extracts_once_and_reuses_stored_criteria(tmp_path):
+    store = CriteriaStore(str(tmp_path / "criteria.sqlite3"))
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return [{"name": "Budget", "must_have": True}]
+
+    first = store.get_or_extract("template", "flow:node", "Has a budget", extract)
+    second = store.get_or_extract("template", "flow:node", "Has a budget", extract)
+
+    assert first == second == [{"name": "Budget", "must_have": True}]
+    assert len(calls) == 1
+
+
+def test_empty_criteria_are_not_stored(tmp_path):
+    store = CriteriaStore(str(tmp_path / "criteria.sqlite3"))
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return []
+
+    assert store.get_or_extract("template", "flow:node", "Has a budget", extract) == []
+    assert store.get_or_extract("template", "flow:node", "Has a budget", extract) == []
+    assert len(calls) == 2
+
+
+def test_extraction_locks_are_dropped(tmp_path):
+    store = CriteriaStore(str(tmp_path / "criteria.sqlite3"))
+
+    store.get_or_extract("template", "flow:node", "Has a budget", lambda: [{"name": "Budget"}])
+    store.get_or_extract("template", "flow:other", "Has a budget", lambda: [])
+
+    assert store._locks == {}
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from src.crewai import pre_verify_agent
+from src.crewai.verdict_cache import VerdictCache
+
+CRITERIA = json.dumps([{"name": "Location", "description": "Based in Ho Chi Minh City", "must_have": True}])
+
+
+def lead(lead_id):
+    return {"leadId": lead_id, "leadData": {"full_name": f"Lead {lead_id}", "city": "Ho Chi Minh City"}}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite3"))
+    monkeypatch.setattr(pre_verify_agent, "VERDICT_CACHE_ENABLED", True)
+    monkeypatch.setattr(pre_verify_agent, "get_verdict_cache", lambda: cache)
+    return cache
+
+
+def test_batch_keeps_cache_hits_next_to_fresh_results(cache, monkeypatch):
+    cached = lead("cached")
+    key = cache.key("preverify", pre_verify_agent.PREVERIFY_TEMPLATE,
+                    pre_verify_agent._verdict_inputs(cached["leadData"], CRITERIA))
+    cache.put(key, "preverify", {"pass": True, "criteria_results": []})
+
+    sent = []
+
+    def judge_chunk(chunk, criteria_field):
+        sent.append([item["leadId"] for item in chunk])
+        return {item["leadId"]: {"pass": False, "criteria_results": []} for item in chunk}
+
+    monkeypatch.setattr(pre_verify_agent, "_preverify_chunk", judge_chunk)
+
+    results = pre_verify_agent.preverify_leads_batch(
+        [cached, lead("a"), lead("b"), lead("c")], CRITERIA, chunk_size=2)
+
+    assert sorted(sum(sent, [])) == ["a", "b", "c"]
+    assert results["cached"]["pass"] is True
+    assert [results[lead_id]["pass"] for lead_id in ("a", "b", "c")] == [False, False, False]
+
+
+def test_batch_stores_fresh_results_for_the_next_call(cache, monkeypatch):
+    monkeypatch.setattr(pre_verify_agent, "_preverify_chunk",
+                        lambda chunk, criteria_field: {item["leadId"]: {"pass": True} for item in chunk})
+    pre_verify_agent.preverify_leads_batch([lead("a")], CRITERIA)
+
+    monkeypatch.setattr(pre_verify_agent, "_preverify_chunk", lambda chunk, criteria_field: pytest.fail("cache miss"))
+    assert pre_verify_agent.preverify_leads_batch([lead("a")], CRITERIA)["a"]["pass"] is True
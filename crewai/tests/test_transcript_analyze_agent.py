@@ -0,0 +1,67 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.crewai import pre_verify_agent, transcript_analyze_agent
+
+CRITERIA = [
+    {"name": "Budget", "description": "Has an approved budget", "must_have": True},
+    {"name": "Location", "description": "Based in Ha Noi", "must_have": False},
+]
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    # Building a crew creates its LLM clients, which only need a key to exist
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+
+@pytest.mark.parametrize("crew_class, role", [
+    ("CriteriaExtractionCrew", "Lead Criteria Extractor"),
+    ("TranscriptAnalyzeCrew", "Lead Qualifier"),
+])
+def test_transcript_crews_build(crew_class, role):
+    crew = getattr(transcript_analyze_agent, crew_class)().crew()
+
+    assert [task.agent.role for task in crew.tasks] == [role]
+
+
+@pytest.mark.parametrize("pool", [
+    transcript_analyze_agent.criteria_crews,
+    transcript_analyze_agent.transcript_crews,
+    transcript_analyze_agent.evidence_crews,
+    pre_verify_agent.preverify_crews,
+    pre_verify_agent.preverify_batch_crews,
+], ids=lambda pool: pool.name)
+def test_pooled_crews_build(pool):
+    # warm_all() builds these when the API servers start
+    assert pool.factory().tasks
+
+
+def test_evidence_crew_builds():
+    crew = transcript_analyze_agent.EvidenceExtractionCrew().crew()
+
+    assert [task.agent.role for task in crew.tasks] == ["Transcript Evidence Finder"]
+
+
+def test_evaluate_chunked_reduces_the_evidence_of_every_chunk(monkeypatch):
+    kicked_off = []
+
+    def kickoff(crew, name, inputs):
+        kicked_off.append((name, inputs["chunk_position"]))
+        assert crew.tasks[0].agent.role == "Transcript Evidence Finder"
+        if "budget" in inputs["chunk"]:
+            evidence = [{"criterion": "Budget", "found": True, "supports": True, "quote": "budget is approved"}]
+        else:
+            evidence = [{"criterion": "Location", "found": True, "supports": True, "quote": "we are in Ha Noi"}]
+        return SimpleNamespace(pydantic=None, json_dict=None, raw=json.dumps({"evidence": evidence}))
+
+    monkeypatch.setattr(transcript_analyze_agent.tracing, "kickoff", kickoff)
+    transcript = "Bot: Where are you?\nCustomer: we are in Ha Noi.\nBot: Budget?\nCustomer: our budget is approved."
+
+    verdict = transcript_analyze_agent.evaluate_chunked(CRITERIA, transcript, chunk_chars=50)
+
+    assert sorted(kicked_off) == [("evidence", "1 of 2"), ("evidence", "2 of 2")]
+    assert verdict["pass"] is True
+    assert [result["passed"] for result in verdict["criteria_results"]] == [True, True]
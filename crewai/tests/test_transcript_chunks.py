@@ -0,0 +1,64 @@
+from src.crewai.transcript_chunks import chunk_transcript, reduce_evidence, split_turns
+
+CRITERIA = [
+    {"name": "Budget", "must_have": True},
+    {"name": "Location", "must_have": False},
+]
+
+
+def test_single_line_transcript_splits_at_repeated_speakers():
+    transcript = "Bot: Where are you based? Customer: Ha Noi. Bot: Great. Customer: Thanks."
+
+    assert split_turns(transcript) == [
+        "Bot: Where are you based?",
+        "Customer: Ha Noi.",
+        "Bot: Great.",
+        "Customer: Thanks.",
+    ]
+
+
+def test_chunks_keep_whole_turns_in_order():
+    transcript = "\n".join(f"Customer: answer number {index}." for index in range(10))
+
+    chunks = chunk_transcript(transcript, 60)
+
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert "\n".join(chunks) == transcript
+
+
+def test_long_turn_is_cut_at_sentence_ends():
+    turn = "Customer: " + " ".join(f"Sentence {index}." for index in range(20))
+
+    chunks = chunk_transcript(turn, 50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_last_relevant_evidence_decides_a_criterion():
+    evidence = [
+        [{"criterion": "Budget", "found": True, "supports": False, "quote": "No budget yet"}],
+        [{"criterion": "budget", "found": True, "supports": True, "quote": "We approved 10k"},
+         {"criterion": "Location", "found": False, "supports": None}],
+    ]
+
+    verdict = reduce_evidence(CRITERIA, evidence)
+
+    assert verdict["criteria_results"][0] == {
+        "criterion": "Budget", "passed": True, "reason": "We approved 10k", "must_have": True,
+    }
+    assert verdict["criteria_results"][1]["passed"] is False
+    assert verdict["pass"] is True
+
+
+def test_failed_must_have_fails_the_lead():
+    evidence = [[
+        {"criterion": "Budget", "found": True, "supports": False, "quote": "No budget"},
+        {"criterion": "Location", "found": True, "supports": True, "quote": "Ha Noi"},
+    ]]
+
+    verdict = reduce_evidence(CRITERIA, evidence)
+
+    assert verdict["pass"] is False
+    assert verdict["message"] == "Must-have criteria not met: Budget"
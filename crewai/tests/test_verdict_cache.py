@@ -0,0 +1,45 @@
+import itertools
+from types import SimpleNamespace
+
+from src.crewai import verdict_cache
+from src.crewai.verdict_cache import VerdictCache
+
+
+def test_key_ignores_input_order():
+    first = VerdictCache.key("preverify", "v1", {"a": 1, "b": 2})
+    second = VerdictCache.key("preverify", "v1", {"b": 2, "a": 1})
+
+    assert first == second
+    assert first != VerdictCache.key("preverify", "v2", {"a": 1, "b": 2})
+
+
+def test_put_and_get(tmp_path):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite3"))
+
+    cache.put("key", "preverify", {"pass": True})
+
+    assert cache.get("key") == {"pass": True}
+    assert cache.get("other") is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite3"), ttl=-1)
+
+    cache.put("key", "preverify", {"pass": True})
+
+    assert cache.get("key") is None
+
+
+def test_eviction_keeps_the_most_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(verdict_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    monkeypatch.setattr(verdict_cache, "_EVICT_EVERY", 3)
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite3"), max_entries=2)
+
+    cache.put("a", "preverify", 1)
+    cache.put("b", "preverify", 2)
+    cache.put("c", "preverify", 3)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
@@ -10,6 +10,7 @@ const config = {
     port: process.env.PORT,
     feRedirectUri: process.env.FE_REDIRECT_URI,
     buildMode: process.env.BUILD_MODE,
+    traceFile: process.env.TRACE_FILE,
     salt: process.env.SALT,
     accessTokenPrivateKey: process.env.ACCESS_TOKEN_PRIVATE_KEY,
     refreshTokenPrivateKey: process.env.REFRESH_TOKEN_PRIVATE_KEY,
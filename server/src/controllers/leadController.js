@@ -50,7 +50,13 @@ export const publishLead = async (req, res, next) => {
     try {
         const { userId, leadId, result, isRetry } = req.body;
 
-        const finalResult = await services.publishByApi(userId, leadId, result, isRetry);
+        const finalResult = await services.publishByApi(
+            userId,
+            leadId,
+            result,
+            isRetry,
+            req.headers.traceparent
+        );
         res.status(StatusCodes.OK).json(finalResult);
     } catch (err) {
         next(err);
@@ -7,6 +7,21 @@ import getObjectId from "../utils/getObjectId.js";
 import Producer from "../config/rabbitMQ.js";
 import Flow from "../models/flow.js";
 
+// Fanout exchange the celery workers listen on to drop their cached copy of a flow
+const FLOW_CACHE_EXCHANGE = "flowCache.invalidate";
+
+const invalidateFlowCache = async (flow) => {
+    try {
+        await Producer.createExchange(FLOW_CACHE_EXCHANGE, "fanout");
+        await Producer.publishMessage(FLOW_CACHE_EXCHANGE, "", {
+            flowId: flow._id,
+            version: flow.updatedAt,
+        });
+    } catch (error) {
+        console.error("❌ Flow cache invalidation failed:", error);
+    }
+};
+
 export const checkFlowExists = async (flowId, userId) => {
     try {
         let flowExists = await Flow.findOne({
@@ -143,6 +158,7 @@ export const updateFlow = async (flowId, data, user) => {
         });
         flow.routeData = routeData || flow.routeData;
         let result = await flow.save();
+        await invalidateFlowCache(flow);
 
         if (oldNodeData && flow.status == 2) {
             //Delete old queue
@@ -199,6 +215,7 @@ export const updateStatus = async (flowId, status, user) => {
         flow.lastModified = new Date();
 
         let result = await flow.save();
+        await invalidateFlowCache(flow);
 
         if (flow.status == 0 || flow.status == 1) {
             console.log("Deleting queue...");
@@ -243,6 +260,7 @@ export const permanentDeleteFlow = async (flowId, user) => {
         if (result.deletedCount === 0) {
             throw new ApiError(StatusCodes.INTERNAL_SERVER_ERROR, "Failed to delete flow");
         }
+        await invalidateFlowCache(flow);
 
         return {
             success: true,
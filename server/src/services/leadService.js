@@ -6,6 +6,7 @@ import getObjectId from "../utils/getObjectId.js";
 import Producer from "../config/rabbitMQ.js";
 import Lead from "../models/lead.js";
 import * as flowService from "./flowService.js";
+import { startSpan, endSpan, traceparentOf } from "../utils/tracing.js";
 
 export const getAllLeads = async (userId) => {
     try {
@@ -129,7 +130,8 @@ export const publishLead = async (
     nodeId,
     leads,
     result = null,
-    isRetry = false
+    isRetry = false,
+    traceparent = null
 ) => {
     try {
         const flow = await flowService.checkFlowExists(flowId, userId);
@@ -179,18 +181,32 @@ export const publishLead = async (
 
         await Promise.all(
             leads.map(async (lead) => {
-                await Producer.publishToCelery(
-                    targetExchange,
-                    routingKey,
-                    {
-                        leadId: lead._id,
-                        flowId,
-                        userId,
-                        nodeId,
-                        targetNode: routing.target,
-                    },
-                    task
-                );
+                // One trace per lead, continued by the worker that runs the task
+                const span = startSpan("publish lead", traceparent, {
+                    leadId: String(lead._id),
+                    flowId: String(flowId),
+                    node: routing.target,
+                });
+                try {
+                    await Producer.publishToCelery(
+                        targetExchange,
+                        routingKey,
+                        {
+                            leadId: lead._id,
+                            flowId,
+                            userId,
+                            nodeId,
+                            targetNode: routing.target,
+                            flowVersion: flow.updatedAt,
+                            // Epoch seconds, workers measure queue wait from it
+                            publishedAt: Date.now() / 1000,
+                            traceparent: traceparentOf(span),
+                        },
+                        task
+                    );
+                } finally {
+                    endSpan(span);
+                }
             })
         );
 
@@ -200,13 +216,21 @@ export const publishLead = async (
     }
 };
 
-export const publishByApi = async (userId, leadId, result, isRetry) => {
+export const publishByApi = async (userId, leadId, result, isRetry, traceparent = null) => {
     try {
         let lead = await Lead.findOne({ _id: getObjectId(leadId), userId: getObjectId(userId) });
         if (!lead) {
             throw new ApiError(StatusCodes.NOT_FOUND, "Lead not found.");
         }
-        return await publishLead(lead.userId, lead.flowId, lead.nodeId, [lead], result, isRetry);
+        return await publishLead(
+            lead.userId,
+            lead.flowId,
+            lead.nodeId,
+            [lead],
+            result,
+            isRetry,
+            traceparent
+        );
     } catch (error) {
         throw error;
     }
@@ -226,6 +226,8 @@ export const qualifyLead = async (lead) => {
             body: JSON.stringify({
                 transcript: lead.leadData.transcript,
                 customerPrompt: node.data.settings.prompt,
+                flowId: flows[0]._id,
+                nodeId: node.id,
             }),
         });
         let result = await response.json();
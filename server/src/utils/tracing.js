@@ -0,0 +1,40 @@
+import crypto from "crypto";
+import fs from "fs";
+import config from "../config/environment.js";
+
+// W3C trace context: version-traceid-parentid-flags
+const TRACEPARENT = /^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$/;
+
+// Continues the trace of a valid traceparent, otherwise starts a new one
+export const startSpan = (name, traceparent = null, attributes = {}) => {
+    const match = typeof traceparent === "string" ? TRACEPARENT.exec(traceparent.trim().toLowerCase()) : null;
+    return {
+        traceId: match ? match[1] : crypto.randomBytes(16).toString("hex"),
+        spanId: crypto.randomBytes(8).toString("hex"),
+        parentId: match ? match[2] : null,
+        name,
+        start: Date.now() / 1000,
+        startedAt: process.hrtime.bigint(),
+        attributes,
+    };
+};
+
+export const traceparentOf = (span) => `00-${span.traceId}-${span.spanId}-01`;
+
+// Appends the span to TRACE_FILE as one JSON line, the same format the workers and crewai write
+export const endSpan = (span, error = null) => {
+    if (!config.traceFile) return;
+    const record = {
+        traceId: span.traceId,
+        spanId: span.spanId,
+        parentId: span.parentId,
+        name: span.name,
+        service: "server",
+        start: span.start,
+        durationMs: Number(process.hrtime.bigint() - span.startedAt) / 1e6,
+        attributes: error ? { ...span.attributes, error: error.message } : span.attributes,
+    };
+    fs.appendFile(config.traceFile, JSON.stringify(record) + "\n", (err) => {
+        if (err) console.error("Failed to export span:", err.message);
+    });
+};